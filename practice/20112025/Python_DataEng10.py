@@ -5,6 +5,12 @@ Yes, Please Pl create log file by writing sample python code. Initially, Pl crea
 C:\Users\user\Desktop\snowflake\Python\
 │
 ├── file_utils.py              ← module with reusable functions
+├── archive_index.py           ← retention index of written archives (sqlite)
+├── feed_watch.py              ← watch mode: reports feed files once fully written
+├── task_graph.py              ← runs the per-feed chains concurrently (multi-feed runs)
+├── run_manifest.py            ← stages done per input file, so reruns resume (sqlite)
+├── customer_cleansing.py      ← customer feed stages: validate / cleanse / load (Python_DataEng14)
+├── bulk_loader.py             ← loads the staged customers (Python_DataEng18)
 ├── main_script.py             ← main driver script
 └── basic_checks.log           ← log file (auto-created)
 
@@ -12,22 +18,204 @@ C:\Users\user\Desktop\snowflake\Python\
 🧩 file_utils.py → the module
 -----------------------------
 import os
-import shutil
 import logging
+import gzip
+import bz2
+import lzma
+import zipfile
+import time
+import json
+import hashlib
+import fnmatch
+import atexit
+import queue
+import threading
+import mmap
+import uuid
+import sqlite3
+import tracemalloc
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, MemoryHandler
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
+from archive_index import (INDEX_FILES, index_archive, expired_archives, remove_from_index, reconcile_index,
+                           index_is_empty)
+
+try:
+    import resource          # peak RSS (not available on Windows)
+except ImportError:
+    resource = None
+
+LOG_FILE = "basic_checks.log"
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+LOG_DATEFMT = "%Y-%m-%d %H:%M:%S"
+LOG_BATCH_SIZE = 500          # async mode: records written to disk in one go
+LOG_FLUSH_INTERVAL = 1.0      # async mode: seconds of idle time before a partial batch is written
+
+_log_listener = None
+
+
+# Queue listener that also writes out a partial batch whenever the queue goes idle
+class _BatchingQueueListener(QueueListener):
+    def dequeue(self, block):
+        while True:
+            try:
+                return self.queue.get(block=block, timeout=LOG_FLUSH_INTERVAL)
+            except queue.Empty:
+                for handler in self.handlers:
+                    handler.flush()
+
 
 # Setup logging
-def setup_logger():
-    log_file = "basic_checks.log"
-    logging.basicConfig(
-        filename=log_file,
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S"
-    )
-    return logging.getLogger()
+# async_mode=False: every logger call writes to basic_checks.log directly.
+# async_mode=True : logger calls only put the record on an in-memory queue; a background
+#                   thread writes them to basic_checks.log in batches (errors are written at once).
+def setup_logger(async_mode=False):
+    global _log_listener
+    if not async_mode:
+        logging.basicConfig(
+            filename=LOG_FILE,
+            level=logging.INFO,
+            format=LOG_FORMAT,
+            datefmt=LOG_DATEFMT
+        )
+        return logging.getLogger()
+
+    root = logging.getLogger()
+    if _log_listener is not None:
+        return root
+
+    file_handler = logging.FileHandler(LOG_FILE)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATEFMT))
+    batch_handler = MemoryHandler(LOG_BATCH_SIZE, flushLevel=logging.ERROR, target=file_handler)
+
+    log_queue = queue.SimpleQueue()
+    root.setLevel(logging.INFO)
+    root.addHandler(QueueHandler(log_queue))
+    _log_listener = _BatchingQueueListener(log_queue, batch_handler)
+    _log_listener.start()
+    atexit.register(shutdown_logger)
+    return root
+
+
+# Write out everything still queued and stop the background thread (no-op in sync mode)
+def shutdown_logger():
+    global _log_listener
+    if _log_listener is None:
+        return
+    _log_listener.stop()                 # drains the queue before returning
+    for handler in _log_listener.handlers:
+        target = handler.target
+        handler.close()                  # flushes the last batch into the file handler
+        target.close()
+    _log_listener = None
+
+
+# export BASIC_CHECKS_ASYNC_LOG=1 to switch on asynchronous logging
+logger = setup_logger(async_mode=os.environ.get("BASIC_CHECKS_ASYNC_LOG") == "1")
+
+
+# Stage instrumentation (opt-in)
+# with stage("purge"):   logs one "STAGE ..." line with wall time, CPU time, rows, bytes,
+#                        peak traced Python memory (tracemalloc) and peak process RSS;
+# log_stage_summary():  logs an end-of-run table per stage name.
+# Off by default (tracemalloc slows allocations down); export BASIC_CHECKS_STAGE_STATS=1
+# or call enable_stage_stats() to switch it on.
+# CPU time is that of the thread running the stage. The traced peak is process-wide: it is only
+# restarted when no stage is running in another thread, so stages that overlap across threads
+# (task_graph) report the peak of the whole overlap rather than wiping each other's.
+_stage_stats = None       # list of finished stages while enabled
+_stage_local = threading.local()   # per thread: running stages, innermost last (for nested peak memory)
+_stage_lock = threading.Lock()
+_stages_running = 0       # running stages in all threads
+
+
+def enable_stage_stats():
+    global _stage_stats
+    if _stage_stats is None:
+        _stage_stats = []
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024) if os.uname().sysname == "Darwin" else peak / 1024, 1)
+
+
+def _stage_stack():
+    # stages running in different threads (task_graph) nest separately
+    if not hasattr(_stage_local, "stack"):
+        _stage_local.stack = []
+    return _stage_local.stack
+
+
+def record_stage(name, wall, cpu, rows=None, nbytes=None, peak_mb=None):
+    if _stage_stats is None:
+        return
+    entry = {"stage": name, "wall_s": round(wall, 4), "cpu_s": round(cpu, 4), "rows": rows,
+             "bytes": nbytes, "peak_py_mb": peak_mb, "peak_rss_mb": _peak_rss_mb()}
+    _stage_stats.append(entry)
+    logger.info("STAGE " + " ".join(f"{key}={value}" for key, value in entry.items() if value is not None))
+
+
+# Measures the block; rows/bytes can be passed in or filled in inside the block via the yielded dict
+@contextmanager
+def stage(name, rows=None, nbytes=None):
+    info = {"rows": rows, "bytes": nbytes, "peak": 0}
+    if _stage_stats is None:
+        yield info
+        return
+
+    global _stages_running
+    stack = _stage_stack()
+    with _stage_lock:
+        if stack:                    # keep the parent's peak before resetting it for this stage
+            parent = stack[-1]
+            parent["peak"] = max(parent["peak"], tracemalloc.get_traced_memory()[1])
+        if _stages_running == len(stack):        # no stage running in another thread
+            tracemalloc.reset_peak()
+        _stages_running += 1
+    stack.append(info)
+    wall_start, cpu_start = time.perf_counter(), time.thread_time()
+    try:
+        yield info
+    finally:
+        wall, cpu = time.perf_counter() - wall_start, time.thread_time() - cpu_start
+        with _stage_lock:
+            _stages_running -= 1
+        stack.pop()
+        peak = max(info["peak"], tracemalloc.get_traced_memory()[1])
+        if stack:
+            stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+        record_stage(name, wall, cpu, info["rows"], info["bytes"], round(peak / (1024 * 1024), 2))
 
-logger = setup_logger()
+
+# End-of-run table: stages with the same name (e.g. one per chunk) are added up
+def log_stage_summary():
+    if not _stage_stats:
+        return
+    totals = {}
+    for entry in _stage_stats:
+        total = totals.setdefault(entry["stage"], {"runs": 0, "wall_s": 0.0, "cpu_s": 0.0, "rows": 0,
+                                                   "bytes": 0, "peak_py_mb": 0.0})
+        total["runs"] += 1
+        for key in ("wall_s", "cpu_s", "rows", "bytes"):
+            total[key] += entry[key] or 0
+        total["peak_py_mb"] = max(total["peak_py_mb"], entry["peak_py_mb"] or 0)
+
+    logger.info("---- Stage summary ----")
+    logger.info(f"{'stage':<36} {'runs':>5} {'wall s':>9} {'cpu s':>9} {'rows':>12} {'MB':>10} {'peak MB':>8}")
+    for name, total in totals.items():
+        logger.info(f"{name:<36} {total['runs']:>5} {total['wall_s']:>9.3f} {total['cpu_s']:>9.3f} "
+                    f"{total['rows']:>12} {total['bytes'] / (1024 * 1024):>10.1f} {total['peak_py_mb']:>8.1f}")
+    logger.info(f"peak process RSS: {_peak_rss_mb()} MB")
+
+
+if os.environ.get("BASIC_CHECKS_STAGE_STATS") == "1":
+    enable_stage_stats()
 
 
 # Check for directory existence
@@ -54,33 +242,476 @@ def check_files_exist(dir_path, files_list):
     return all_exist
 
 
+# Batched existence check
+# Lists dir_path once with os.scandir and checks every expected name and glob pattern
+# (e.g. "order_*.csv") against that single listing; only matched files are stat-ed.
+# Returns a report that later stages can reuse instead of stat-ing the files again:
+#   {"dir_exists": bool,
+#    "found":    {file name: {"path": ..., "size": bytes, "mtime": epoch seconds}},
+#    "missing":  [expected names / patterns with no match],
+#    "patterns": {pattern: [matched file names]}}
+def scan_feed_files(dir_path, files_list):
+    report = {"dir_exists": True, "found": {}, "missing": [], "patterns": {}}
+    entries = {}
+    try:
+        with os.scandir(dir_path) as listing:
+            for entry in listing:
+                if entry.is_file():
+                    entries[entry.name] = entry
+    except (FileNotFoundError, NotADirectoryError):
+        logger.error(f"Directory not found: {dir_path}")
+        report["dir_exists"] = False
+        report["missing"] = list(files_list)
+        return report
+    logger.info(f"Directory exists: {dir_path}")
+
+    for expected in files_list:
+        if _is_pattern(expected):
+            matched = sorted(fnmatch.filter(entries, expected))
+            report["patterns"][expected] = matched
+        else:
+            matched = [expected] if expected in entries else []
+
+        if not matched:
+            logger.error(f"File missing: {os.path.join(dir_path, expected)}")
+            report["missing"].append(expected)
+        for name in matched:
+            if name in report["found"]:
+                continue
+            st = entries[name].stat()
+            report["found"][name] = {"path": entries[name].path, "size": st.st_size, "mtime": st.st_mtime}
+            logger.info(f"File exists: {entries[name].path}")
+    return report
+
+
+def _is_pattern(name):
+    return any(ch in name for ch in "*?[")
+
+
+# Header contract check
+# Reads only the header line of each file through mmap (the body is never read or parsed)
+# and compares it with the required columns of the file's contract. Many files are checked
+# at once in a thread pool, as each check is a few KB of I/O. Returns {file name: report}:
+#   {"ok": bool, "error": message or None, "header": [columns found],
+#    "missing":   [required columns not in the header],
+#    "extra":     [header columns that are not required],
+#    "reordered": [required columns not in the contract order],
+#    "duplicate": [columns that appear more than once]}
+# Extra columns only fail the check when allow_extra is False, reordered ones when check_order is True.
+def read_header(file_path, header_line=1, delimiter=",", encoding="utf-8"):
+    with open(file_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = 0
+            for _ in range(header_line - 1):          # header after a few banner lines
+                start = mm.find(b"\n", start) + 1
+                if start == 0:
+                    return []
+            end = mm.find(b"\n", start)
+            line = mm[start:end if end >= 0 else size]
+    text = line.decode(encoding).rstrip("\r").lstrip("\ufeff")
+    return [column.strip().strip('"') for column in text.split(delimiter)] if text else []
+
+
+def compare_header(header, required, allow_extra=True, check_order=True):
+    header_set, required_set = set(header), set(required)
+    present = [column for column in header if column in required_set]
+    expected = [column for column in required if column in header_set]
+    report = {
+        "ok": True,
+        "error": None,
+        "header": header,
+        "missing": [column for column in required if column not in header_set],
+        "extra": [column for column in header if column not in required_set],
+        "reordered": [column for column, want in zip(present, expected) if column != want],
+        "duplicate": sorted({column for column in header if header.count(column) > 1}),
+    }
+    report["ok"] = not (report["missing"] or report["duplicate"]
+                        or (report["extra"] and not allow_extra)
+                        or (report["reordered"] and check_order))
+    return report
+
+
+def _check_header(file_path, required, header_line, delimiter, allow_extra, check_order):
+    try:
+        header = read_header(file_path, header_line, delimiter)
+    except (OSError, ValueError) as e:                # unreadable file / not valid text
+        return {"ok": False, "error": str(e), "header": [], "missing": list(required),
+                "extra": [], "reordered": [], "duplicate": []}
+    return compare_header(header, required, allow_extra, check_order)
+
+
+# contracts: {file name or glob pattern: [required columns in order]}; the first matching entry applies.
+# files: names to check (e.g. scan_feed_files(...)["found"]); by default every file in dir_path
+# that matches a contract.
+def verify_headers(dir_path, contracts, files=None, header_line=1, delimiter=",",
+                   allow_extra=True, check_order=True, workers=16):
+    if files is None:
+        with os.scandir(dir_path) as listing:
+            files = [entry.name for entry in listing if entry.is_file()]
+
+    jobs = {}
+    for name in files:
+        for expected, required in contracts.items():
+            if name == expected or (_is_pattern(expected) and fnmatch.fnmatch(name, expected)):
+                jobs[name] = required
+                break
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(jobs)))) as pool:
+        futures = {pool.submit(_check_header, os.path.join(dir_path, name), required, header_line,
+                               delimiter, allow_extra, check_order): name
+                   for name, required in jobs.items()}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+
+    failed = 0
+    for name in sorted(results):
+        report = results[name]
+        if report["ok"]:
+            continue
+        failed += 1
+        if report["error"]:
+            logger.error(f"Header check failed: {name}: {report['error']}")
+        else:
+            problems = [f"{key}={report[key]}" for key in ("missing", "extra", "reordered", "duplicate")
+                        if report[key]]
+            logger.error(f"Header check failed: {name}: {' '.join(problems)}")
+    if results:
+        logger.info(f"Header check: {len(results) - failed} of {len(results)} files match their contract")
+    return results
+
+
+# Streaming archiver
+# Reads the source in fixed-size chunks and writes them straight into the archive,
+# so memory stays flat whatever the file size. The archive is written under a
+# "<name>.<writer>.part" name inside archive_dir (unique per writer, so concurrent
+# writers of the same archive never share one) and renamed once complete.
+CHUNK_SIZE = 4 * 1024 * 1024   # 4 MB
+
+# codec -> (archive extension, default compression level)
+ARCHIVE_CODECS = {
+    "zip":   (".zip", 6),
+    "gzip":  (".gz", 6),
+    "bz2":   (".bz2", 9),
+    "lzma":  (".xz", 6),
+}
+
+
+def archive_name(file, codec="zip"):
+    if codec not in ARCHIVE_CODECS:
+        raise ValueError(f"Unsupported codec: {codec}")
+    ext = ARCHIVE_CODECS[codec][0]
+    if codec == "zip":
+        return os.path.splitext(file)[0] + ext     # customer.csv -> customer.zip
+    return file + ext                              # customer.csv -> customer.csv.gz
+
+
+def _open_archive(part_path, member, codec, level):
+    if codec == "zip":
+        zf = zipfile.ZipFile(part_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=level)
+        return zf, zf.open(member, "w", force_zip64=True)
+    if codec == "gzip":
+        return None, gzip.open(part_path, "wb", compresslevel=level)
+    if codec == "bz2":
+        return None, bz2.open(part_path, "wb", compresslevel=level)
+    return None, lzma.open(part_path, "wb", preset=level)
+
+
+def _part_name(path):
+    return f"{path}.{uuid.uuid4().hex}.part"
+
+
+# archive_path: write to this path instead of <archive_dir>/<archive_name(file)>
+# member: name of the file inside a zip archive (default: the source file name)
+def stream_compress(src_file, archive_dir, codec="zip", level=None, chunk_size=CHUNK_SIZE, archive_path=None,
+                    member=None):
+    file = os.path.basename(src_file)
+    if archive_path is None:
+        archive_path = os.path.join(archive_dir, archive_name(file, codec))
+    part_path = _part_name(archive_path)
+    if level is None:
+        level = ARCHIVE_CODECS[codec][1]
+
+    try:
+        container, out = _open_archive(part_path, member or file, codec, level)
+        try:
+            with open(src_file, "rb") as src:
+                while True:
+                    chunk = src.read(chunk_size)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+        finally:
+            out.close()
+            if container is not None:
+                container.close()
+        os.replace(part_path, archive_path)
+    except Exception:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    return archive_path
+
+
+# Content-addressed archive store (dedup mode)
+# Upstream often re-sends identical files. In dedup mode every archive is keyed by the
+# SHA-256 of its content, so an identical re-send is never compressed or stored again:
+#   <archive_dir>/store/objects/<sha256><ext>    one compressed copy per distinct content
+#                                                (zip member named <sha256>: the content may
+#                                                arrive under several file names)
+#   <archive_dir>/store/refs/<file name>.json    arrivals of that file name, newest last
+# Only the last keep_versions arrivals per file name are kept; objects no longer
+# referenced by any file name are deleted.
+# Compression runs in parallel; publishing an object, the ref update and the cleanup of
+# unreferenced objects run one writer at a time (worker processes and threads alike)
+# under a sqlite write lock on <archive_dir>/store/store.lock.
+STORE_DIR = "store"
+STORE_LOCK = "store.lock"
+
+
+def file_sha256(src_file, chunk_size=CHUNK_SIZE):
+    digest = hashlib.sha256()
+    with open(src_file, "rb") as src:
+        while True:
+            chunk = src.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_refs(refs_path):
+    if not os.path.exists(refs_path):
+        return []
+    with open(refs_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_refs(refs_path, refs):
+    part_path = _part_name(refs_path)
+    with open(part_path, "w", encoding="utf-8") as f:
+        json.dump(refs, f, indent=1)
+    os.replace(part_path, refs_path)
+
+
+@contextmanager
+def _store_lock(store_dir, timeout=600):
+    conn = sqlite3.connect(os.path.join(store_dir, STORE_LOCK), timeout=timeout, isolation_level=None)
+    try:
+        conn.execute("BEGIN IMMEDIATE")         # waits while another writer holds it
+        yield
+    finally:
+        conn.close()                            # ends the transaction, releasing the lock
+
+
+# Archive src_file into the store; returns (sha256, True if the content was already stored)
+# Hashing is a plain read pass, much cheaper than compressing, and it lets a
+# duplicate skip compression entirely.
+def store_deduplicated(src_file, archive_dir, codec="zip", level=None, keep_versions=5):
+    file = os.path.basename(src_file)
+    store_dir = os.path.join(archive_dir, STORE_DIR)
+    objects_dir = os.path.join(store_dir, "objects")
+    refs_dir = os.path.join(store_dir, "refs")
+    os.makedirs(objects_dir, exist_ok=True)
+    os.makedirs(refs_dir, exist_ok=True)
+
+    sha = file_sha256(src_file)
+    object_name = sha + ARCHIVE_CODECS[codec][0]
+    object_path = os.path.join(objects_dir, object_name)
+    new_path = None
+    try:
+        while True:
+            if new_path is None and not os.path.exists(object_path):
+                new_path = stream_compress(src_file, objects_dir, codec, level, member=sha,
+                                           archive_path=f"{object_path}.{uuid.uuid4().hex}.new")
+            with _store_lock(store_dir):
+                # checked again under the lock: another writer may have stored the same content
+                # meanwhile (ours is dropped), or removed the object we saw as unreferenced
+                duplicate = os.path.exists(object_path)
+                if not duplicate and new_path is None:
+                    continue
+                if not duplicate:
+                    os.replace(new_path, object_path)
+                    new_path = None
+                _add_ref(refs_dir, objects_dir, file, sha, object_name, os.path.getsize(src_file), keep_versions)
+                return sha, duplicate
+    finally:
+        if new_path is not None and os.path.exists(new_path):
+            os.remove(new_path)
+
+
+# Append one arrival to the refs of file and drop the objects no longer referenced (under the store lock)
+def _add_ref(refs_dir, objects_dir, file, sha, object_name, size, keep_versions):
+    refs_path = os.path.join(refs_dir, file + ".json")
+    refs = _read_refs(refs_path)
+    refs.append({
+        "sha256": sha,
+        "object": object_name,
+        "size": size,
+        "arrived": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    })
+    dropped = refs[:-keep_versions] if keep_versions else []
+    refs = refs[-keep_versions:] if keep_versions else refs
+    _write_refs(refs_path, refs)
+
+    if dropped:
+        _delete_unreferenced(objects_dir, refs_dir, {ref["object"] for ref in dropped})
+
+
+def _delete_unreferenced(objects_dir, refs_dir, candidates):
+    with os.scandir(refs_dir) as listing:
+        for entry in listing:
+            if entry.name.endswith(".json"):
+                candidates -= {ref["object"] for ref in _read_refs(entry.path)}
+    for object_name in candidates:
+        try:
+            os.remove(os.path.join(objects_dir, object_name))
+        except FileNotFoundError:
+            pass
+
+
+# Compress a single file and remove the original (also runs inside worker processes)
+# keep_versions=None writes <archive_dir>/<archive name>; a number uses the dedup store.
+# Returns (file, status, error, duplicate)
+def _compress_one(src_dir, archive_dir, file, codec="zip", level=None, keep_versions=None):
+    src_file = os.path.join(src_dir, file)
+    if not os.path.exists(src_file):
+        return file, "missing", None, False
+
+    duplicate = False
+    try:
+        if keep_versions is None:
+            stream_compress(src_file, archive_dir, codec, level)
+        else:
+            _, duplicate = store_deduplicated(src_file, archive_dir, codec, level, keep_versions)
+    except Exception as e:
+        return file, "failed", str(e), False
+
+    # original is removed only after its archive has been written successfully
+    try:
+        os.remove(src_file)
+    except Exception as e:
+        return file, "archived", str(e), duplicate
+    return file, "removed", None, duplicate
+
+
+# _compress_one plus its wall/CPU time and the source size, for stage instrumentation
+# (measured in the process that did the work, recorded by the parent)
+def _compress_one_timed(src_dir, archive_dir, file, codec="zip", level=None, keep_versions=None):
+    try:
+        nbytes = os.path.getsize(os.path.join(src_dir, file))
+    except OSError:
+        nbytes = None
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    result = _compress_one(src_dir, archive_dir, file, codec, level, keep_versions)
+    return result, time.perf_counter() - wall_start, time.process_time() - cpu_start, nbytes
+
+
+# Log the outcome of one file (always done in the parent process)
+# use_index: record the new archive in the retention index (see archive_index.py)
+def _log_compress_result(file, status, error, duplicate, archive_dir=None, codec="zip", use_index=False):
+    if status == "missing":
+        logger.warning(f"File not found for compression: {file}")
+        return
+    if status == "failed":
+        logger.error(f"Error compressing {file}: {error}")
+        return
+
+    if duplicate:
+        logger.info(f"Duplicate content, recorded as reference only: {file}")
+    else:
+        logger.info(f"Compressed and archived: {file}")
+    if use_index:
+        try:
+            name = archive_name(file, codec)
+            index_archive(archive_dir, name, os.stat(os.path.join(archive_dir, name)).st_mtime)
+        except Exception as e:
+            logger.error(f"Error updating archive index for {file}: {e}")
+    if status == "removed":
+        logger.info(f"Removed original file after compression: {file}")
+    else:
+        logger.error(f"Error removing original file {file}: {error}")
+
+
 # Compress and archive files
-def compress_and_archive(src_dir, archive_dir, files_list):
+# workers=1 compresses one file after another; workers>1 compresses each file in its own process
+# codec: zip / gzip / bz2 / lzma, level: codec compression level (None = codec default)
+# use_index: record every written archive in the retention index used by purge_old_archives
+# dedup_versions: use the content-addressed store and keep this many versions per file name
+#                 (retention is then by version count, so the retention index is not used)
+# Returns {file: status} with status missing / failed / archived / removed.
+def compress_and_archive(src_dir, archive_dir, files_list, workers=1, codec="zip", level=None,
+                         use_index=False, dedup_versions=None):
     os.makedirs(archive_dir, exist_ok=True)
-    
-    for file in files_list:
-        src_file = os.path.join(src_dir, file)
-        if os.path.exists(src_file):
-            zip_base_name = os.path.splitext(file)[0]
-            zip_path = os.path.join(archive_dir, zip_base_name)
-            
+    use_index = use_index and dedup_versions is None
+    statuses = {}
+
+    if workers <= 1 or len(files_list) <= 1:
+        for file in files_list:
+            with stage(f"compress {file}") as info:
+                if os.path.exists(os.path.join(src_dir, file)):
+                    info["bytes"] = os.path.getsize(os.path.join(src_dir, file))
+                result = _compress_one(src_dir, archive_dir, file, codec, level, dedup_versions)
+            _log_compress_result(*result, archive_dir, codec, use_index)
+            statuses[file] = result[1]
+        return statuses
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(files_list))) as pool:
+        futures = {
+            pool.submit(_compress_one_timed, src_dir, archive_dir, file, codec, level, dedup_versions): file
+            for file in files_list
+        }
+        for future in as_completed(futures):
+            file = futures[future]
             try:
-                shutil.make_archive(zip_path, 'zip', src_dir, file)
-                logger.info(f"Compressed and archived: {file}")
-                os.remove(src_file)
-                logger.info(f"Removed original file after compression: {file}")
+                result, wall, cpu, nbytes = future.result()
+                record_stage(f"compress {file}", wall, cpu, nbytes=nbytes)
+                _log_compress_result(*result, archive_dir, codec, use_index)
+                statuses[file] = result[1]
             except Exception as e:
                 logger.error(f"Error compressing {file}: {e}")
-        else:
-            logger.warning(f"File not found for compression: {file}")
+                statuses[file] = "failed"
+    return statuses
 
 
 # Purge old files (older than 7 days)
-def purge_old_archives(archive_dir, days=7):
+# use_index=False walks archive_dir and checks the mtime of every file.
+# use_index=True asks the retention index for expired archives with one range query,
+# reconcile=True first rescans archive_dir to repair index drift (files added/removed by hand).
+def purge_old_archives(archive_dir, days=7, use_index=False, reconcile=False):
     now = datetime.now()
     threshold = now - timedelta(days=days)
-    
+
+    if not os.path.isdir(archive_dir):
+        logger.info(f"No archive directory yet, nothing to purge: {archive_dir}")
+        return
+
+    # a new (or emptied) index knows nothing about archives written before it existed
+    # or copied in by hand, so it is filled from a rescan first
+    if reconcile or (use_index and index_is_empty(archive_dir)):
+        added, removed = reconcile_index(archive_dir)
+        logger.info(f"Archive index reconciled: {added} added, {removed} removed")
+
+    if use_index:
+        purged = []
+        for file in expired_archives(archive_dir, threshold.timestamp()):
+            try:
+                os.remove(os.path.join(archive_dir, file))
+                logger.info(f"Purged old archive: {file}")
+                purged.append(file)
+            except FileNotFoundError:
+                purged.append(file)      # already gone, just drop it from the index
+            except Exception as e:
+                logger.error(f"Error purging file {file}: {e}")
+        remove_from_index(archive_dir, purged)
+        return
+
     for file in os.listdir(archive_dir):
+        if file in INDEX_FILES:
+            continue
         file_path = os.path.join(archive_dir, file)
         if os.path.isfile(file_path):
             modified_time = datetime.fromtimestamp(os.path.getmtime(file_path))
@@ -93,41 +724,656 @@ def purge_old_archives(archive_dir, days=7):
 
 
 
+🧩 archive_index.py → retention index
+-------------------------------------
+# Small sqlite table (name, mtime) kept inside archive_dir.
+# compress_and_archive adds a row for every archive it writes, so purge_old_archives
+# can find expired archives without listing and stat-ing the whole directory.
+import os
+import sqlite3
+
+INDEX_FILE = ".archive_index.db"
+INDEX_FILES = (INDEX_FILE, INDEX_FILE + "-journal")   # never purged or indexed
+
+
+def _connect(archive_dir):
+    conn = sqlite3.connect(os.path.join(archive_dir, INDEX_FILE), timeout=30)
+    conn.execute("CREATE TABLE IF NOT EXISTS archives (name TEXT PRIMARY KEY, mtime REAL NOT NULL)")
+    conn.execute("CREATE INDEX IF NOT EXISTS archives_mtime ON archives (mtime)")
+    return conn
+
+
+# Add (or refresh) one archive in the index
+def index_archive(archive_dir, name, mtime):
+    conn = _connect(archive_dir)
+    try:
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO archives (name, mtime) VALUES (?, ?)", (name, mtime))
+    finally:
+        conn.close()
+
+
+# True when the index has no rows (just created, or every archive purged)
+def index_is_empty(archive_dir):
+    conn = _connect(archive_dir)
+    try:
+        return conn.execute("SELECT 1 FROM archives LIMIT 1").fetchone() is None
+    finally:
+        conn.close()
+
+
+# Names of archives last modified before threshold (epoch seconds)
+def expired_archives(archive_dir, threshold):
+    conn = _connect(archive_dir)
+    try:
+        rows = conn.execute("SELECT name FROM archives WHERE mtime < ? ORDER BY mtime", (threshold,))
+        return [name for (name,) in rows]
+    finally:
+        conn.close()
+
+
+def remove_from_index(archive_dir, names):
+    if not names:
+        return
+    conn = _connect(archive_dir)
+    try:
+        with conn:
+            conn.executemany("DELETE FROM archives WHERE name = ?", [(name,) for name in names])
+    finally:
+        conn.close()
+
+
+# Full rescan with os.scandir: index every file on disk, drop rows whose file is gone.
+# Returns (rows added or refreshed, rows removed).
+def reconcile_index(archive_dir):
+    on_disk = {}
+    with os.scandir(archive_dir) as entries:
+        for entry in entries:
+            if entry.name in INDEX_FILES or entry.name.endswith(".part"):
+                continue
+            if entry.is_file():
+                on_disk[entry.name] = entry.stat().st_mtime
+
+    conn = _connect(archive_dir)
+    try:
+        with conn:
+            indexed = {name: mtime for name, mtime in conn.execute("SELECT name, mtime FROM archives")}
+            stale = [name for name in indexed if name not in on_disk]
+            changed = [(name, mtime) for name, mtime in on_disk.items() if indexed.get(name) != mtime]
+            conn.executemany("DELETE FROM archives WHERE name = ?", [(name,) for name in stale])
+            conn.executemany("INSERT OR REPLACE INTO archives (name, mtime) VALUES (?, ?)", changed)
+    finally:
+        conn.close()
+    return len(changed), len(stale)
+
+
+
+🧩 feed_watch.py → watch mode for the feed directory
+----------------------------------------------------
+# Instead of a full directory scan on every cron run, keep running and react to new files.
+# Linux: inotify tells us which file names changed (no rescans at all while idle).
+# Elsewhere: the directory mtime is polled and the directory is only re-listed when it changed.
+# A file is "complete" once its size and mtime have not changed for settle_seconds,
+# so partially written files (still being copied in) are never picked up.
+# on_tick (optional) is called on every round, also while no file arrives (e.g. a periodic purge).
+import os
+import sys
+import time
+import fnmatch
+import select
+import struct
+import ctypes
+import ctypes.util
+from file_utils import logger
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+_EVENT_HEADER = struct.Struct("iIII")     # wd, mask, cookie, len
+
+
+class _Inotify:
+    def __init__(self, dir_path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(dir_path), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {dir_path}")
+
+    # File names with events, waiting at most timeout seconds
+    def changed_names(self, timeout):
+        names = set()
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        while ready:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if name:
+                    names.add(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _open_inotify(dir_path):
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        return _Inotify(dir_path)
+    except (OSError, AttributeError) as e:
+        logger.warning(f"inotify not available ({e}), falling back to polling")
+        return None
+
+
+def _wanted(name, files_list):
+    return any(fnmatch.fnmatch(name, pattern) for pattern in files_list)
+
+
+def _list_wanted(dir_path, files_list):
+    with os.scandir(dir_path) as listing:
+        return {entry.name for entry in listing if entry.is_file() and _wanted(entry.name, files_list)}
+
+
+# Watch dir_path and call on_ready(file_name) once for every expected file that is complete.
+# files_list: exact names or glob patterns. Runs until stop() returns True (forever by default).
+def watch_feed(dir_path, files_list, on_ready, settle_seconds=5, poll_interval=2, stop=None, on_tick=None):
+    inotify = _open_inotify(dir_path)
+    logger.info(f"Watching {dir_path} ({'inotify' if inotify else 'polling'})")
+
+    pending = {name: None for name in _list_wanted(dir_path, files_list)}  # name -> (size, mtime, since)
+    dir_mtime = os.stat(dir_path).st_mtime
+    try:
+        while stop is None or not stop():
+            if inotify is not None:
+                changed = {name for name in inotify.changed_names(poll_interval) if _wanted(name, files_list)}
+            else:
+                time.sleep(poll_interval)
+                changed = set()
+                current_mtime = os.stat(dir_path).st_mtime
+                if current_mtime != dir_mtime:           # entries added/removed -> re-list
+                    dir_mtime = current_mtime
+                    changed = _list_wanted(dir_path, files_list) - pending.keys()
+            for name in changed:
+                pending.setdefault(name, None)
+
+            # only the pending files are stat-ed, never the whole directory
+            now = time.time()
+            for name in list(pending):
+                try:
+                    st = os.stat(os.path.join(dir_path, name))
+                except FileNotFoundError:
+                    del pending[name]
+                    continue
+                seen = pending[name]
+                if seen is None or seen[:2] != (st.st_size, st.st_mtime):
+                    pending[name] = (st.st_size, st.st_mtime, now)
+                elif now - seen[2] >= settle_seconds:
+                    del pending[name]
+                    logger.info(f"File ready: {name}")
+                    try:
+                        on_ready(name)
+                    except Exception as e:
+                        logger.error(f"Error processing {name}: {e}")
+
+            if on_tick is not None:
+                try:
+                    on_tick()
+                except Exception as e:
+                    logger.error(f"Error in watch tick: {e}")
+    finally:
+        if inotify is not None:
+            inotify.close()
+
+
+
+🧩 run_manifest.py → resumable runs
+----------------------------------
+# Small sqlite table recording, per input fingerprint (path, size, mtime and optionally the
+# SHA-256 of the content), which pipeline stages are done. A rerun after a failure skips the
+# stages already done for the same input and resumes at the first unfinished one.
+# Overlapping runs (e.g. two cron runs) are safe: a stage is claimed in one IMMEDIATE
+# transaction before it starts, so only one run works on it; the claim of a run that died
+# expires after LEASE_SECONDS.
+import os
+import time
+import socket
+import sqlite3
+import threading
+
+MANIFEST_FILE = ".run_manifest.db"
+LEASE_SECONDS = 6 * 3600     # a "running" claim older than this belongs to a dead run
+
+
+def _connect(manifest_path):
+    conn = sqlite3.connect(manifest_path, timeout=30, isolation_level=None)    # transactions by hand
+    conn.execute("PRAGMA journal_mode=WAL")          # readers never wait for the writer
+    conn.execute("""CREATE TABLE IF NOT EXISTS stages (
+                        path TEXT NOT NULL, size INTEGER NOT NULL, mtime REAL NOT NULL,
+                        sha256 TEXT NOT NULL DEFAULT '', stage TEXT NOT NULL,
+                        state TEXT NOT NULL, owner TEXT, updated REAL NOT NULL,
+                        PRIMARY KEY (path, size, mtime, sha256, stage))""")
+    return conn
+
+
+def _owner():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def _key(fp):
+    return (os.path.abspath(fp["path"]), fp["size"], fp["mtime"], fp.get("sha256") or "")
+
+
+# fp: {"path", "size", "mtime", "sha256" (optional)}; size/mtime come from the directory scan
+def fingerprint(path, size=None, mtime=None, sha256=""):
+    if size is None or mtime is None:
+        st = os.stat(path)
+        size, mtime = st.st_size, st.st_mtime
+    return {"path": path, "size": size, "mtime": mtime, "sha256": sha256}
+
+
+# Returns "claimed" (go ahead, then call finish_stage), "done" (skip it) or
+# "busy" (another run is working on it right now)
+def claim_stage(manifest_path, fp, stage, lease_seconds=LEASE_SECONDS):
+    conn = _connect(manifest_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")                # one writer at a time: check + claim is atomic
+        try:
+            row = conn.execute("SELECT state, updated FROM stages WHERE path = ? AND size = ? AND mtime = ? "
+                               "AND sha256 = ? AND stage = ?", (*_key(fp), stage)).fetchone()
+            now = time.time()
+            if row is not None and row[0] == "done":
+                result = "done"
+            elif row is not None and row[0] == "running" and now - row[1] < lease_seconds:
+                result = "busy"
+            else:
+                conn.execute("INSERT OR REPLACE INTO stages (path, size, mtime, sha256, stage, state, owner, updated) "
+                             "VALUES (?, ?, ?, ?, ?, 'running', ?, ?)", (*_key(fp), stage, _owner(), now))
+                result = "claimed"
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+    finally:
+        conn.close()
+
+
+# ok=True records the stage as done, ok=False releases the claim so the next run retries it
+def finish_stage(manifest_path, fp, stage, ok=True):
+    conn = _connect(manifest_path)
+    try:
+        conn.execute("UPDATE stages SET state = ?, owner = ?, updated = ? WHERE path = ? AND size = ? "
+                     "AND mtime = ? AND sha256 = ? AND stage = ?",
+                     ("done" if ok else "failed", _owner(), time.time(), *_key(fp), stage))
+    finally:
+        conn.close()
+
+
+# Forget the stage for this input (for stages that are never skipped, only guarded while running)
+def release_stage(manifest_path, fp, stage):
+    conn = _connect(manifest_path)
+    try:
+        conn.execute("DELETE FROM stages WHERE path = ? AND size = ? AND mtime = ? AND sha256 = ? AND stage = ?",
+                     (*_key(fp), stage))
+    finally:
+        conn.close()
+
+
+def completed_stages(manifest_path, fp):
+    conn = _connect(manifest_path)
+    try:
+        rows = conn.execute("SELECT stage FROM stages WHERE path = ? AND size = ? AND mtime = ? AND sha256 = ? "
+                            "AND state = 'done' ORDER BY updated", _key(fp))
+        return [stage for (stage,) in rows]
+    finally:
+        conn.close()
+
+
+# Runs func(*args) as stage of the input fp unless the manifest has it as done.
+# Returns ("done", None) when skipped, ("ran", result) otherwise; raises if another run holds the stage.
+# record=False: the stage is only guarded while it runs and never recorded as done.
+def run_recorded(manifest_path, fp, stage, func, *args, record=True):
+    state = claim_stage(manifest_path, fp, stage)
+    if state == "done":
+        return "done", None
+    if state == "busy":
+        raise RuntimeError(f"{stage} of {os.path.basename(fp['path'])} is running in another run")
+    try:
+        result = func(*args)
+    except BaseException:
+        finish_stage(manifest_path, fp, stage, ok=False)
+        raise
+    if record:
+        finish_stage(manifest_path, fp, stage)
+    else:
+        release_stage(manifest_path, fp, stage)
+    return "ran", result
+
+
+# Drop entries not touched for days (inputs that are long gone)
+def prune_manifest(manifest_path, days=30):
+    conn = _connect(manifest_path)
+    try:
+        return conn.execute("DELETE FROM stages WHERE updated < ?", (time.time() - days * 86400,)).rowcount
+    finally:
+        conn.close()
+
+
+
+🧩 task_graph.py → concurrent task graph for multi-feed runs
+-----------------------------------------------------------
+# Runs named tasks in a thread pool as soon as the tasks they depend on have finished.
+# A task that fails (raises) is logged and all tasks depending on it are skipped, while
+# unrelated tasks (e.g. the chains of the other feed files) carry on. Tasks added with
+# always=True run once their dependencies have finished, whatever the outcome
+# (e.g. "purge after all archives"). Dependencies must be added before the tasks that
+# need them, so the graph can never contain a cycle.
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from file_utils import logger, stage
+
+
+class TaskGraph:
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.tasks = {}            # name -> (func, args, kwargs, after, always), in the order added
+
+    def add(self, name, func, *args, after=(), always=False, **kwargs):
+        if name in self.tasks:
+            raise ValueError(f"Task added twice: {name}")
+        unknown = [dep for dep in after if dep not in self.tasks]
+        if unknown:
+            raise ValueError(f"Task {name} depends on unknown task(s): {', '.join(unknown)}")
+        self.tasks[name] = (func, args, kwargs, tuple(after), always)
+        return name
+
+    @staticmethod
+    def _run_task(name, func, args, kwargs):
+        with stage(f"task {name}"):
+            return func(*args, **kwargs)
+
+    # Returns {task name: "done" / "failed" / "skipped"}
+    def run(self):
+        status = {}
+        waiting = dict(self.tasks)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while waiting or running:
+                # dependencies come earlier in insertion order, so one pass also settles skip chains
+                for name, (func, args, kwargs, after, always) in list(waiting.items()):
+                    if any(dep not in status for dep in after):
+                        continue
+                    del waiting[name]
+                    failed_deps = [dep for dep in after if status[dep] != "done"]
+                    if failed_deps and not always:
+                        status[name] = "skipped"
+                        logger.warning(f"Task skipped: {name} (after {', '.join(failed_deps)})")
+                        continue
+                    running[pool.submit(self._run_task, name, func, args, kwargs)] = name
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        future.result()
+                        status[name] = "done"
+                    except Exception as e:
+                        status[name] = "failed"
+                        logger.error(f"Task failed: {name}: {e}")
+        return status
+
+
+
 🚀 main_script.py → the main driver script
 -------------------------------------------
+# python main_script.py          -> one run: every feed file through its own check -> ... -> archive chain,
+#                                   feeds side by side, then purge (cron)
+# python main_script.py --watch  -> keep running: each feed file goes through the same chain as soon as
+#                                   it is complete, old archives are purged every watch_purge_interval
+# A rerun (e.g. after a failure at 3am) skips the stages already done for the same input files.
+# export BASIC_CHECKS_STAGE_STATS=1 to log time/memory per stage and a summary table at the end
 import os
+import sys
+import time
+import fnmatch
 from file_utils import (
-    check_directory_exists,
-    check_files_exist,
+    scan_feed_files,
+    verify_headers,
+    file_sha256,
     compress_and_archive,
     purge_old_archives,
+    shutdown_logger,
+    stage,
+    log_stage_summary,
     logger
 )
+from feed_watch import watch_feed
+from task_graph import TaskGraph
+from run_manifest import fingerprint, run_recorded, prune_manifest
 
 # Define directories and file names
 base_path = r"C:\Users\user\Desktop\snowflake\Python"
 feed_dir = os.path.join(base_path, "feed")
 archive_dir = os.path.join(base_path, "archive")
 
+# Exact names or glob patterns (e.g. "order_*.csv")
 files_to_check = ["customer.csv", "supplier.csv", "order.csv"]
 
+# Required header columns (in order) per file name or pattern; a file that breaks its
+# contract is not archived (the other feeds carry on). Empty dict = no header check.
+header_contracts = {
+    # "customer.csv": ["customer_id", "name", "city", "state", "join_date", "mobile", "email", "pincode"],
+    # "order_*.csv":  ["order_id", "order_date", "customer_id", "item_id", "qty", "price", "amount"],
+}
+
+# Customer feed stages (customer_cleansing.py): staged file, rejected rows and the
+# load target (a sqlite file stands in for the target database)
+staging_dir = os.path.join(base_path, "staging")
+load_db = os.path.join(base_path, "staging.db")
+load_table = "stg_customers"
+# The customer feed is stopped (not staged, not archived) when a rule fails on more than
+# this share of its rows
+max_violation_ratio = 0.05
+
+# Number of feed chains running at the same time (1 = one feed after another)
+feed_workers = os.cpu_count() or 1
+
+# Archive codec (zip / gzip / bz2 / lzma) and level: low level for hot feeds, high for cold feeds
+archive_codec = "zip"
+archive_level = None
+
+# Keep a retention index of archives so the purge does not stat every archive;
+# set reconcile_archive_index = True now and then to repair drift with a full rescan
+use_archive_index = True
+reconcile_archive_index = False
+
+# Content-addressed dedup store: identical re-sends are stored once and only the last
+# N versions per file name are kept (None = plain per-file archives)
+dedup_versions = None
+
+# Run manifest: stages done per input (path, size, mtime) so a rerun resumes where the last
+# run stopped; manifest_hash = True also keys inputs by their SHA-256 (reads every file once).
+# None = no manifest, every run does everything
+run_manifest = os.path.join(base_path, ".run_manifest.db")
+manifest_hash = False
+manifest_keep_days = 30
+
+# Watch mode: seconds a file must stay unchanged before it is treated as complete,
+# and how often old archives are purged while watching
+watch_settle_seconds = 5
+watch_purge_interval = 3600
+
+
+def _stages_for(file):
+    for expected, stages in feed_stages.items():
+        if file == expected or fnmatch.fnmatch(file, expected):
+            return stages
+    return []
+
+
+def check_feed(file):
+    if header_contracts:
+        report = verify_headers(feed_dir, header_contracts, files=[file]).get(file)
+        if report is not None and not report["ok"]:
+            raise ValueError("header contract broken")
+
+
+def archive_feed(file):
+    status = compress_and_archive(feed_dir, archive_dir, [file], codec=archive_codec, level=archive_level,
+                                  use_index=use_archive_index, dedup_versions=dedup_versions).get(file)
+    if status not in ("archived", "removed"):
+        raise RuntimeError(f"not archived ({status})")
+
+
+def validate_customer_feed(file_path):
+    from customer_cleansing import load_customers, run_rules, CUSTOMER_RULES, PARSED_CACHE_DIR
+    df = load_customers(file_path, cache_dir=os.path.join(base_path, PARSED_CACHE_DIR))   # reused by cleanse
+    report, _ = run_rules(df, CUSTOMER_RULES)
+    worst = report.loc[report["violations"].idxmax()] if len(report) and len(df) else None
+    if worst is not None and worst["violations"] > max_violation_ratio * len(df):
+        raise ValueError(f"{worst['column']}:{worst['rule']} fails on {worst['violations']} of {len(df)} rows")
+
+
+def cleanse_customer_feed(file_path):
+    from customer_cleansing import stage_customers, PARSED_CACHE_DIR
+    os.makedirs(staging_dir, exist_ok=True)
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    stage_customers(file_path, os.path.join(staging_dir, f"stg_{name}"),
+                    rejects_file=os.path.join(staging_dir, f"rejects_{name}.csv"),
+                    cache_dir=os.path.join(base_path, PARSED_CACHE_DIR))
+
+
+def load_customer_feed(file_path):
+    from customer_cleansing import load_staged, STAGING_FORMAT
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    if STAGING_FORMAT != "csv":
+        raise ValueError(f"bulk load needs csv staging, not {STAGING_FORMAT}")
+    load_staged(os.path.join(staging_dir, f"stg_{name}.csv"), load_db, load_table,
+                bad_file=os.path.join(staging_dir, f"stg_{name}.bad"))
+
+
+# Extra stages per feed, run in order between the check and the archive:
+# file name or pattern -> [(stage name, function(file_path))]. A stage that raises stops only its own feed.
+# The customer_cleansing imports sit in the stage functions, so the other feeds run without pandas.
+feed_stages = {
+    "customer.csv": [("validate", validate_customer_feed), ("cleanse", cleanse_customer_feed),
+                     ("load", load_customer_feed)],
+}
+
+
+# Runs one stage of a feed unless the manifest says it is already done for this input
+# (record=False: only claimed while running, never skipped, e.g. archive, which removes its input)
+def run_stage(fp, stage_name, func, *args, record=True):
+    if run_manifest is None:
+        return func(*args)
+    if manifest_hash and not fp["sha256"]:
+        fp["sha256"] = file_sha256(fp["path"])        # once per feed, by its first stage
+
+    state, result = run_recorded(run_manifest, fp, stage_name, func, *args, record=record)
+    if state == "done":
+        logger.info(f"Already done for this input, skipped: {os.path.basename(fp['path'])}: {stage_name}")
+    return result
+
+
+# check -> feed stages -> archive for one feed file; returns the name of its archive task
+def _add_feed_chain(graph, file, path, size, mtime):
+    fp = fingerprint(path, size, mtime)
+    previous = graph.add(f"{file}: check", run_stage, fp, "check", check_feed, file)
+    for stage_name, func in _stages_for(file):
+        previous = graph.add(f"{file}: {stage_name}", run_stage, fp, stage_name, func, path, after=[previous])
+    return graph.add(f"{file}: archive", run_stage, fp, "archive", archive_feed, file,
+                     record=False, after=[previous])
+
+
+def run_once():
+    # one directory listing covers both the directory check and the file checks
+    with stage("directory + file check") as info:
+        feed_report = scan_feed_files(feed_dir, files_to_check)
+        info["rows"] = len(feed_report["found"])
+        info["bytes"] = sum(found["size"] for found in feed_report["found"].values())
+    if feed_report["dir_exists"] and feed_report["missing"]:
+        logger.warning(f"Missing in feed directory (other feeds carry on): {', '.join(feed_report['missing'])}")
+
+    # one chain per feed file, feeds run side by side; the purge waits for every archive
+    graph = TaskGraph(max_workers=feed_workers)
+    archives = []
+    for file, found in feed_report["found"].items():
+        archives.append(_add_feed_chain(graph, file, found["path"], found["size"], found["mtime"]))
+    graph.add("purge", purge_old_archives, archive_dir, days=7, use_index=use_archive_index,
+              reconcile=reconcile_archive_index, after=archives, always=True)
+
+    status = graph.run()
+    archived = sum(status[name] == "done" for name in archives)
+    logger.info(f"Feeds archived: {archived} of {len(archives)}")
+    if run_manifest is not None:
+        prune_manifest(run_manifest, days=manifest_keep_days)
+
+
+def run_watch():
+    last_purge = 0
+
+    # each complete file goes through the same chain as in run_once (header check, feed stages, archive)
+    def process_ready_file(file):
+        path = os.path.join(feed_dir, file)
+        st = os.stat(path)
+        graph = TaskGraph(max_workers=1)
+        archive_task = _add_feed_chain(graph, file, path, st.st_size, st.st_mtime)
+        if graph.run()[archive_task] != "done":
+            logger.warning(f"Not archived, left in the feed directory: {file}")
+
+    # called on every watch round, so old archives are purged even while no files arrive
+    def purge_if_due():
+        nonlocal last_purge
+        if time.time() - last_purge >= watch_purge_interval:
+            purge_old_archives(archive_dir, days=7, use_index=use_archive_index)
+            if run_manifest is not None:
+                prune_manifest(run_manifest, days=manifest_keep_days)
+            last_purge = time.time()
+
+    os.makedirs(archive_dir, exist_ok=True)
+    purge_old_archives(archive_dir, days=7, use_index=use_archive_index,
+                       reconcile=reconcile_archive_index)
+    last_purge = time.time()
+    watch_feed(feed_dir, files_to_check, process_ready_file, settle_seconds=watch_settle_seconds,
+               on_tick=purge_if_due)
+
+
 # Workflow execution with logging
-try:
-    logger.info("---- Starting File Check Process ----")
+# (__main__ guard is required because compression worker processes re-import this script on Windows)
+if __name__ == "__main__":
+    try:
+        logger.info("---- Starting File Check Process ----")
 
-    if check_directory_exists(feed_dir):
-        if check_files_exist(feed_dir, files_to_check):
-            logger.info("All files exist. Proceeding to compression...")
-            compress_and_archive(feed_dir, archive_dir, files_to_check)
+        if "--watch" in sys.argv[1:]:
+            run_watch()
         else:
-            logger.warning("Some files are missing in feed directory.")
-    
-    purge_old_archives(archive_dir, days=7)
+            run_once()
+
+        logger.info("---- Process Completed Successfully ----")
+
+    except KeyboardInterrupt:
+        logger.info("---- Watch stopped ----")
 
-    logger.info("---- Process Completed Successfully ----")
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
 
-except Exception as e:
-    logger.error(f"Unexpected error: {e}")
+    finally:
+        log_stage_summary()
+        shutdown_logger()
 
 
 🧾 Example Log Output (basic_checks.log)
@@ -77,3 +77,91 @@ Output
 2025-11-09 00:31:28.488480-05:00
 2025-11-09 11:01:28.488722+05:30
 
+
+
+Batch timezone conversion (whole columns to UTC)
+------------------------------------------------
+import time
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+
+@lru_cache(maxsize=None)
+def get_zone(name):
+    return ZoneInfo(name)                 # one ZoneInfo per zone name for the whole run
+
+
+def to_utc(local_times, zones, ambiguous="NaT", nonexistent="NaT", errors="raise"):
+    '''Converts a column of naive local timestamps to UTC, each row in its own source zone.
+       local_times : Series of strings or datetime64 (local wall-clock time, no offset)
+       zones       : Series of IANA names (same index) or one name for the whole column
+       ambiguous   : repeated hour when clocks go back - "earliest" (DST), "latest" (standard), "NaT", "raise"
+       nonexistent : skipped hour when clocks go forward - "shift_forward", "shift_backward", "NaT", "raise"
+       errors      : unknown zone names - "raise" or "coerce" (rows become NaT)
+       Rows are grouped by zone and every group is localized in one vectorized call,
+       so no Python datetime is built per row.'''
+    local_times = pd.to_datetime(local_times)
+    if isinstance(zones, str):
+        zones = pd.Series(zones, index=local_times.index)
+
+    codes, names = pd.factorize(zones)                    # -1 = missing zone
+    utc = np.full(len(local_times), np.datetime64("NaT"), dtype="datetime64[ns]")
+    values = pd.DatetimeIndex(local_times).as_unit("ns")
+
+    order = np.argsort(codes, kind="stable")              # rows of one zone next to each other
+    bounds = np.searchsorted(codes[order], np.arange(len(names) + 1))
+    for code, name in enumerate(names):
+        rows = order[bounds[code]:bounds[code + 1]]
+        try:
+            zone = get_zone(name)
+        except (KeyError, ValueError):                    # ZoneInfoNotFoundError is a KeyError
+            if errors == "raise":
+                raise ValueError(f"Unknown time zone '{name}' ({len(rows)} rows)")
+            continue
+
+        if ambiguous == "earliest":
+            policy = np.ones(len(rows), dtype=bool)       # True = read as the DST (first) occurrence
+        elif ambiguous == "latest":
+            policy = np.zeros(len(rows), dtype=bool)
+        else:
+            policy = ambiguous
+        localized = values[rows].tz_localize(zone, ambiguous=policy, nonexistent=nonexistent)
+        utc[rows] = localized.tz_convert("UTC").tz_localize(None).to_numpy()
+
+    return pd.Series(utc, index=local_times.index).dt.tz_localize("UTC")
+
+
+# DST edge cases: 01:30 happens twice on 2025-11-02 and 02:30 never happens on 2025-03-09 in New York
+df = pd.DataFrame({
+    "event_time": ["2025-10-07 15:45:30", "2025-10-07 15:45:30", "2025-10-07 15:45:30",
+                   "2025-11-02 01:30:00", "2025-03-09 02:30:00", "2025-10-07 15:45:30"],
+    "source_tz":  ["UTC", "EST", "Asia/Kolkata", "America/New_York", "America/New_York", None],
+})
+df["event_utc"] = to_utc(df["event_time"], df["source_tz"])
+df["event_utc_earliest"] = to_utc(df["event_time"], df["source_tz"], ambiguous="earliest", nonexistent="shift_forward")
+print(df.to_string(index=False))
+
+# 1M rows across 4 zones
+n = 1000000
+rng = np.random.default_rng(0)
+big = pd.DataFrame({
+    "event_time": pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 365 * 86400, n), unit="s"),
+    "source_tz":  rng.choice(["UTC", "EST", "Asia/Kolkata", "America/New_York"], n),
+})
+start = time.perf_counter()
+big["event_utc"] = to_utc(big["event_time"], big["source_tz"], ambiguous="earliest", nonexistent="shift_forward")
+print(f"{n} rows converted in {time.perf_counter() - start:.2f}s")
+
+
+Output
+------
+         event_time        source_tz                 event_utc        event_utc_earliest
+2025-10-07 15:45:30              UTC 2025-10-07 15:45:30+00:00 2025-10-07 15:45:30+00:00
+2025-10-07 15:45:30              EST 2025-10-07 20:45:30+00:00 2025-10-07 20:45:30+00:00
+2025-10-07 15:45:30     Asia/Kolkata 2025-10-07 10:15:30+00:00 2025-10-07 10:15:30+00:00
+2025-11-02 01:30:00 America/New_York                       NaT 2025-11-02 05:30:00+00:00
+2025-03-09 02:30:00 America/New_York                       NaT 2025-03-09 07:00:00+00:00
+2025-10-07 15:45:30              NaN                       NaT                       NaT
+1000000 rows converted in 0.26s
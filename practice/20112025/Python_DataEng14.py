@@ -3,15 +3,48 @@ Pandas DataFrame MiniProject
 
 '''This code cleanses, standardize data and also removes duplicates'''
 
+import io
+import os
+import re
+import sys
+import glob
+import pickle
+import hashlib
+import numpy as np
 import pandas as pd
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
+try:                                   # only needed for the parquet staging format
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+try:                                   # per-stage time/memory lines in basic_checks.log (Python_DataEng10 file_utils,
+    from file_utils import stage, log_stage_summary    # switched on with BASIC_CHECKS_STAGE_STATS=1)
+except ImportError:
+    @contextmanager
+    def stage(name, rows=None, nbytes=None):
+        yield {"rows": rows, "bytes": nbytes}
+
+    def log_stage_summary():
+        pass
+
+try:                                   # stages done per input file, so a rerun resumes (Python_DataEng10 run_manifest)
+    from run_manifest import fingerprint, run_recorded
+except ImportError:
+    fingerprint = run_recorded = None
+
 #add lstrip and rstrip
 
 
-def check_missing_values(df, column_name, df_name):
+def check_missing_values(df, column_name, df_name, rejects=None, sample_rows=5):
     """
     Checks for missing (NaN/None) values in the specified column of a DataFrame.
+    Prints the count and a sample of sample_rows rows; all of them go to rejects (a RejectWriter) if given.
     """
     if column_name not in df.columns:
         print(f" Column '{column_name}' does not exist in the DataFrame.")
@@ -20,9 +53,12 @@ def check_missing_values(df, column_name, df_name):
     missing_count = df[column_name].isna().sum()
 
     if missing_count > 0:
+        missing_rows = df[column_name].isna()
         print(f"  Column '{column_name}' has {missing_count} missing value(s).")
-        print("Rows with missing values:")
-        print(df[df[column_name].isna()])
+        print(f"Rows with missing values (first {sample_rows}):")
+        print(df[missing_rows].head(sample_rows))
+        if rejects is not None:
+            rejects.add(df, missing_rows, f"{column_name}:not_null")
     else:
         print(f" Column '{column_name}' has no missing values.")
 
@@ -38,14 +74,17 @@ def check_email_validity(df, column_name,check_str, df_name):
 
     v_count=0
     #v_count=df_stg_customers[column_name].str.find(check_str)
-    v_count=(~df_stg_customers[column_name].str.contains(check_str, case=False, na=False)).sum()
+    if check_str in FORMAT_PATTERNS:           # e.g. "email": full structure check instead of a substring
+        v_count=(~match_format(df[column_name], check_str).fillna(False).astype(bool)).sum()
+    else:
+        v_count=(~df[column_name].str.contains(check_str, case=False, na=False)).sum()
 
     return v_count
 
-def validate_column_length(df, column_name, expected_length, df_name):
+def validate_column_length(df, column_name, expected_length, df_name, rejects=None, sample_rows=5):
     """
     Checks whether the values in a given column have the specified length (default = 15).
-    Returns a DataFrame of invalid rows.
+    Returns a DataFrame of invalid rows; prints their count and a sample, and streams them to rejects if given.
     """
     invalid_rows = 0
     if column_name not in df.columns:
@@ -56,21 +95,27 @@ def validate_column_length(df, column_name, expected_length, df_name):
         print(" Error: The input 'df' is not a pandas DataFrame.")
         return
         
-    if isinstance(df, pd.DataFrame) and df_name == "df_stg_customers" and column_name == "pincode":
-        df_stg_customers["pincode"] = df_stg_customers["pincode"].round(0).astype(int)
+    # float columns only; integer or text as loaded with CUSTOMER_SCHEMA
+    if isinstance(df, pd.DataFrame) and df_name == "df_stg_customers" and column_name == "pincode" \
+            and pd.api.types.is_float_dtype(df["pincode"]):
+        df["pincode"] = df["pincode"].round(0).astype(int)
         #print(df[column_name].astype(str).str.len().astype(int).head())
         #print("rounding done")
 
-    if isinstance(df, pd.DataFrame) and df_name == "df_stg_customers" and column_name == "mobile":
-        df_stg_customers["mobile"] = df_stg_customers["mobile"].round(0).astype(int)
+    if isinstance(df, pd.DataFrame) and df_name == "df_stg_customers" and column_name == "mobile" \
+            and pd.api.types.is_float_dtype(df["mobile"]):
+        df["mobile"] = df["mobile"].round(0).astype(int)
         #print(df[column_name].astype(str).str.len().astype(int).head())
         #print("rounding done")        
 
-    invalid_rows = df[df[column_name].astype(str).str.len() != expected_length]
+    invalid_mask = df[column_name].astype(str).str.len() != expected_length
+    invalid_rows = df[invalid_mask]
 
     if not invalid_rows.empty:
-        print(f" Invalid rows found in column '{column_name}':")
-        print(invalid_rows[[column_name]])
+        print(f" {len(invalid_rows)} invalid rows found in column '{column_name}' (first {sample_rows}):")
+        print(invalid_rows[[column_name]].head(sample_rows))
+        if rejects is not None:
+            rejects.add(df, invalid_mask, f"{column_name}:length")
     else:
         print(f" All entries in column '{column_name}' have length {expected_length}.")
         
@@ -92,40 +137,679 @@ def clean_and_format_date(date_str):
             continue
     return pd.NaT  # Anything else becomes NULL
 
-# Apply the function
-df_stg_customers = pd.read_csv("customers.csv")
-df_stg_customers['join_date'] = df_stg_customers['join_date'].apply(clean_and_format_date)
+DATE_FORMATS = ("%Y-%m-%d", "%d-%m-%Y", "%d%m%Y")
+
+# DD and MON of DD-MON-YYYY by day / month number (index 0 unused)
+DAY_TEXT = np.array([f"{day:02d}" for day in range(32)], dtype=object)
+MONTH_TEXT = np.array(["", "JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"],
+                      dtype=object)
+
+def format_dates(dates):
+    '''DD-MON-YYYY strings for a datetime Series without NaT (same text as strftime("%d-%b-%Y").upper()),
+       assembled from the day, month and year numbers instead of formatting every date.'''
+    years, year_codes = np.unique(dates.dt.year.to_numpy(), return_inverse=True)
+    year_text = np.array([datetime(year, 1, 1).strftime("%Y") for year in years], dtype=object)
+    return DAY_TEXT[dates.dt.day.to_numpy()] + "-" + MONTH_TEXT[dates.dt.month.to_numpy()] + "-" + \
+        year_text[year_codes.ravel()]
+
+def clean_and_format_date_column(date_series, formats=DATE_FORMATS):
+    '''Vectorized version of clean_and_format_date for a whole column.
+       Parses the column one format at a time; only the values still unparsed
+       are tried with the next format. Returns DD-MON-YYYY strings, NaT if parsing fails.'''
+
+    # each attempt is formatted straight into the result, at whatever resolution
+    # pd.to_datetime chose, so dates like 9999-12-31 or 1600-05-05 are kept
+    formatted = pd.Series(pd.NaT, index=date_series.index, dtype=object)
+    remaining = date_series.notna()
+
+    for fmt in formats:
+        if not remaining.any():
+            break
+        attempt = pd.to_datetime(date_series[remaining], format=fmt, errors="coerce")
+        parsed = attempt.dropna()
+        formatted[parsed.index] = format_dates(parsed)
+        remaining[parsed.index] = False
+
+    # left over: invalid values, and on older pandas (nanosecond timestamps only)
+    # valid dates outside 1677-2262, which the row-by-row version still formats
+    if remaining.any():
+        formatted[remaining] = [clean_and_format_date(value) for value in date_series[remaining]]
+    return formatted
+
+class ValueCache:
+    '''Bounded cache of raw value -> cleansed value for one column.
+       Keeps the most recently used maxsize values; save()/load() carry it over to the next run.'''
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self.values = OrderedDict()
+
+    def lookup(self, value):
+        if value in self.values:
+            self.values.move_to_end(value)
+            return True, self.values[value]
+        return False, None
+
+    def store(self, value, result):
+        self.values[value] = result
+        self.values.move_to_end(value)
+        while len(self.values) > self.maxsize:
+            self.values.popitem(last=False)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump(self.values, f)
+
+    @classmethod
+    def load(cls, path, maxsize=100000):
+        cache = cls(maxsize)
+        try:
+            with open(path, "rb") as f:
+                values = pickle.load(f)
+        except FileNotFoundError:
+            return cache
+        for value, result in values.items():
+            cache.store(value, result)
+        return cache
+
+def normalize_unique(series, cleanser, vectorized=False, cache=None):
+    '''Runs a cleanser on the distinct values of a column only, then maps the results back.
+       cleanser   : scalar function (value -> value), e.g. clean_and_format_date,
+                    or a column function (Series -> Series) when vectorized=True,
+                    e.g. clean_and_format_date_column
+       cache      : optional ValueCache; values already in it are not cleansed again'''
+
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    uniques = list(uniques)
+    results = np.empty(len(uniques) + 1, dtype=object)   # last slot holds the result for null values
+
+    todo = []
+    for i, value in enumerate(uniques):
+        found, result = cache.lookup(value) if cache is not None else (False, None)
+        if found:
+            results[i] = result
+        else:
+            todo.append(i)
+
+    if todo:
+        todo_values = [uniques[i] for i in todo]
+        if vectorized:
+            cleansed = list(cleanser(pd.Series(todo_values, dtype=object)))
+        else:
+            cleansed = [cleanser(value) for value in todo_values]
+        for i, result in zip(todo, cleansed):
+            results[i] = result
+            if cache is not None:
+                cache.store(uniques[i], result)
+
+    if (codes == -1).any():
+        null_value = series[codes == -1].iloc[0]
+        results[-1] = cleanser(pd.Series([null_value], dtype=object)).iloc[0] if vectorized else cleanser(null_value)
+
+    return pd.Series(results.take(codes), index=series.index, name=series.name)
+
+# Feed schema: only these columns are read from customers.csv, straight into compact dtypes.
+#   category : few distinct values stored once (city/state); join_date repeats heavily too,
+#              so its categories are all normalize_unique has to parse
+#   string   : text columns; pincode/mobile too, so gaps don't turn them into float64 and a
+#              malformed value (e.g. 60000A) fails the format rule instead of the whole load
+CUSTOMER_SCHEMA = {
+    "customer_id": "string",
+    "name":        "string",
+    "city":        "category",
+    "state":       "category",
+    "join_date":   "category",
+    "pincode":     "string",
+    "mobile":      "string",
+    "email":       "string",
+}
+
+def load_customers(src, schema=CUSTOMER_SCHEMA, cache_dir=None, **read_csv_args):
+    '''pd.read_csv limited to the schema columns (usecols) with the schema dtypes.
+       Extra arguments (e.g. chunksize) are passed on to read_csv.
+       cache_dir: keep the parsed DataFrame on disk; a rerun on the same unchanged file
+                  (same path, size and mtime) loads the typed columns without parsing CSV.'''
+    if cache_dir is None or "chunksize" in read_csv_args or not isinstance(src, str):
+        return pd.read_csv(src, usecols=list(schema), dtype=schema, **read_csv_args)
+
+    st = os.stat(src)
+    source_key = hashlib.sha1(os.path.abspath(src).encode()).hexdigest()[:16]
+    version_key = hashlib.sha1(repr((st.st_size, st.st_mtime_ns, sorted(schema.items()),
+                                     sorted(read_csv_args.items()))).encode()).hexdigest()[:16]
+    cache_file = os.path.join(cache_dir, f"{source_key}-{version_key}.pkl")
+    if os.path.exists(cache_file):
+        return pd.read_pickle(cache_file)
+
+    df = pd.read_csv(src, usecols=list(schema), dtype=schema, **read_csv_args)
+    os.makedirs(cache_dir, exist_ok=True)
+    for stale in glob.glob(os.path.join(cache_dir, f"{source_key}-*.pkl")):   # older versions of this file
+        os.remove(stale)
+    df.to_pickle(cache_file + ".part")
+    os.replace(cache_file + ".part", cache_file)
+    return df
+
+def staging_schema(df):
+    '''Arrow schema from the column dtypes of the staging frame, not from its values: a column that
+       is all null in the first chunk would otherwise be typed null and every later chunk would fail.
+       Text and category columns are stored as string.'''
+    fields = []
+    for name, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(dtype) or dtype == object:
+            arrow_type = pa.string()
+        else:
+            arrow_type = pa.from_numpy_dtype(getattr(dtype, "numpy_dtype", dtype))   # Int64 -> int64
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+class StagingWriter:
+    '''Writes the staging output as csv or parquet (columnar: downstream readers get typed
+       columns without parsing text). write() can be called once or once per chunk.'''
+
+    def __init__(self, dest_base, fmt="csv"):
+        if fmt not in ("csv", "parquet"):
+            raise ValueError(f"Unsupported staging format: {fmt}")
+        if fmt == "parquet" and pq is None:
+            raise ImportError("parquet staging output needs pyarrow (pip install pyarrow)")
+        self.fmt = fmt
+        self.path = f"{dest_base}.{fmt}"
+        self.parquet_writer = None
+        self.first_write = True
+
+    def write(self, df):
+        if self.fmt == "csv":
+            df.to_csv(self.path, mode="w" if self.first_write else "a", header=self.first_write, index=False)
+        else:
+            if self.parquet_writer is None:
+                self.parquet_writer = pq.ParquetWriter(self.path, staging_schema(df))
+            self.parquet_writer.write_table(pa.Table.from_pandas(df, schema=self.parquet_writer.schema,
+                                                                 preserve_index=False))
+        self.first_write = False
+
+    def close(self):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+
+# Validation rules, declared once per column:
+#   ("not_null",)            value must be present
+#   ("length", n)            value must have exactly n characters/digits
+#   ("contains", text)       value must contain text (case-insensitive)
+#   ("regex", pattern)       value must fully match pattern
+#   ("format", name)         value must fully match FORMAT_PATTERNS[name]
+#   ("range", low, high)     numeric value must be within low..high (None = open end)
+# Missing values only break not_null, contains and regex; length, format and range skip them.
+CUSTOMER_RULES = {
+    "pincode": [("not_null",), ("format", "pincode")],
+    "mobile":  [("not_null",), ("format", "mobile")],
+    "email":   [("not_null",), ("format", "email")],
+}
+
+# Compiled once; kept to the regex subset Arrow's RE2 kernels understand (no lookarounds/backrefs)
+FORMAT_PATTERNS = {
+    "email":   re.compile(r"[A-Za-z0-9_%+-]+(\.[A-Za-z0-9_%+-]+)*"
+                          r"@[A-Za-z0-9]([A-Za-z0-9-]*[A-Za-z0-9])?(\.[A-Za-z0-9]([A-Za-z0-9-]*[A-Za-z0-9])?)*"
+                          r"\.[A-Za-z]{2,}"),
+    "mobile":  re.compile(r"[6-9][0-9]{9}"),           # 10-digit Indian mobile number
+    "pincode": re.compile(r"[1-9][0-9]{5}"),           # 6-digit PIN code, no leading zero
+    "digits":  re.compile(r"[0-9]+"),
+}
+
+# Arrow-backed strings run str.len/contains/fullmatch as Arrow compute kernels instead of per-row Python
+TEXT_DTYPE = "string[pyarrow]" if pa is not None else "string"
+
+def _text_view(values):
+    '''Column as strings for the text rules. Whole-number floats (e.g. a numeric column that
+       had missing values) are written without the trailing ".0".'''
+    if pd.api.types.is_float_dtype(values):
+        values = values.round().astype("Int64")
+    return values.astype(TEXT_DTYPE)
+
+def match_format(values, name):
+    '''Boolean Series: value fully matches FORMAT_PATTERNS[name] (missing values give <NA>).'''
+    return _text_view(values).str.fullmatch(FORMAT_PATTERNS[name])
+
+def _digit_count(values):
+    '''Number of characters of whole numbers without converting them to strings.'''
+    numbers = np.round(values.to_numpy(dtype="float64", na_value=np.nan))
+    whole = np.abs(numbers)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        digits = np.where(whole < 1, 1, np.floor(np.log10(whole)) + 1)
+    return pd.Series(digits + (numbers < 0), index=values.index)   # minus sign counts as a character
+
+def run_rules(df, rules):
+    '''Single-pass rule engine: each column is read once and the pieces the rules need
+       (null mask, string view, lengths) are built once and shared by all rules of that column.
+       Returns (report, violations): report is a DataFrame with one row per rule and its
+       violation count, violations maps "column:rule" to the boolean mask of failing rows.'''
+
+    report_rows = []
+    violations = {}
+
+    for column_name, column_rules in rules.items():
+        if column_name not in df.columns:
+            print(f" Column '{column_name}' not found in DataFrame.")
+            continue
+
+        values = df[column_name]
+        is_null = values.isna()
+        is_numeric = pd.api.types.is_numeric_dtype(values)
+        text = None
+        lengths = None
+
+        for rule in column_rules:
+            kind, args = rule[0], rule[1:]
+
+            if kind == "not_null":
+                failed = is_null
+            elif kind == "length":
+                if lengths is None:
+                    if is_numeric:
+                        lengths = _digit_count(values)
+                    else:
+                        text = _text_view(values) if text is None else text
+                        lengths = text.str.len()
+                failed = ~is_null & (lengths != args[0])
+            elif kind == "format":
+                text = _text_view(values) if text is None else text
+                failed = ~is_null & ~text.str.fullmatch(FORMAT_PATTERNS[args[0]]).fillna(True).astype(bool)
+            elif kind in ("contains", "regex"):
+                text = _text_view(values) if text is None else text
+                if kind == "contains":
+                    matched = text.str.contains(args[0], case=False, regex=False)
+                else:
+                    matched = text.str.fullmatch(args[0])
+                failed = ~matched.fillna(False).astype(bool)
+            elif kind == "range":
+                numbers = pd.to_numeric(values, errors="coerce")
+                low, high = args
+                failed = ~is_null & numbers.isna()
+                if low is not None:
+                    failed |= numbers < low
+                if high is not None:
+                    failed |= numbers > high
+            else:
+                raise ValueError(f"Unknown rule '{kind}' for column '{column_name}'")
+
+            rule_name = f"{column_name}:{kind}"
+            violations[rule_name] = failed
+            report_rows.append({"column": column_name, "rule": kind,
+                                "args": ",".join(map(str, args)), "violations": int(failed.sum())})
+
+    report = pd.DataFrame(report_rows, columns=["column", "rule", "args", "violations"])
+    return report, violations
+
+class RejectWriter:
+    '''Quarantine sink for rows that fail a rule. Rows are tagged with the rule name and their
+       source row number (1 = first data row) and appended to path in batches of batch_rows;
+       only counts and the first sample_rows rows per rule are kept for the console.
+       path=None keeps the rows in memory (used inside worker processes).'''
+
+    def __init__(self, path, batch_rows=100000, sample_rows=5):
+        self.path = path
+        self.batch_rows = batch_rows
+        self.sample_rows = sample_rows
+        self.pending = []
+        self.pending_rows = 0
+        self.first_write = True
+        self.counts = {}
+        self.samples = {}
+
+    def add(self, df, mask, rule, row_offset=0):
+        if not mask.any():
+            return
+        rejected = df[mask].copy()
+        rejected.insert(0, "source_row", rejected.index + 1 + row_offset)
+        rejected.insert(0, "rule", rule)
+        self.add_rejected(rejected)
+
+    def add_rejected(self, rejected):
+        '''Takes rows already tagged by another RejectWriter (e.g. from a worker).'''
+        for rule, rows in rejected.groupby("rule", sort=False):
+            self.counts[rule] = self.counts.get(rule, 0) + len(rows)
+            sample = self.samples.get(rule)
+            if sample is None or len(sample) < self.sample_rows:
+                self.samples[rule] = pd.concat([sample, rows]).head(self.sample_rows) if sample is not None \
+                    else rows.head(self.sample_rows)
+        self.pending.append(rejected)
+        self.pending_rows += len(rejected)
+        if self.path is not None and self.pending_rows >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if self.path is None or not self.pending:
+            return
+        batch = pd.concat(self.pending, ignore_index=True)
+        batch.to_csv(self.path, mode="w" if self.first_write else "a", header=self.first_write, index=False)
+        self.first_write = False
+        self.pending, self.pending_rows = [], 0
+
+    def close(self):
+        self.flush()
+        if self.first_write and self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)              # no rejects this run: don't leave the last run's file behind
+
+    def print_summary(self):
+        if not self.counts:
+            print("No rejected rows.")
+            return
+        print(f"Rejected rows written to {self.path}:")
+        for rule, count in self.counts.items():
+            print(f"  {rule}: {count} row(s), first {min(count, self.sample_rows)}:")
+            print(self.samples[rule].to_string(index=False))
+
+def cleanse_customers(df_stg_customers, rejects=None):
+    '''Runs the cleansing and validation stages on one DataFrame (the whole file, a chunk or a partition).
+       Returns (staging columns, validation report); duplicates are removed by the caller.
+       rejects: optional RejectWriter that receives every row failing a rule.'''
+
+    # Apply the function (whole column at once instead of row by row with .apply);
+    # join_date repeats heavily, so only its distinct values are parsed
+    with stage("clean join_date", rows=len(df_stg_customers)):
+        df_stg_customers['join_date'] = normalize_unique(df_stg_customers['join_date'], clean_and_format_date_column,
+                                                         vectorized=True, cache=join_date_cache)
+
+    # null/length/email checks in one sweep (replaces check_missing_values,
+    # validate_column_length and check_email_validity, each of which scanned the frame again)
+    with stage("validate (run_rules)", rows=len(df_stg_customers)):
+        report, violations = run_rules(df_stg_customers, CUSTOMER_RULES)
+
+    if rejects is not None:
+        with stage("quarantine rejects", rows=len(df_stg_customers)):
+            for rule_name, failed in violations.items():
+                rejects.add(df_stg_customers, failed, rule_name)
+
+    cols_to_display = ["customer_id","name","city","state","join_date"]
+    return df_stg_customers[cols_to_display], report
+
+def merge_reports(reports):
+    '''Adds up the violation counts of several run_rules reports (chunks or partitions).'''
+    return (pd.concat(reports, ignore_index=True)
+              .groupby(["column", "rule", "args"], sort=False, as_index=False)["violations"].sum())
+
+def row_hashes(df, key_columns=None):
+    '''64-bit hash per row (of key_columns, or of the whole row). Values are hashed as text,
+       so the same row gives the same hash whatever dtypes it was loaded with.'''
+    rows = df if key_columns is None else df[key_columns]
+    return pd.util.hash_pandas_object(rows.astype("string"), index=False).to_numpy()
+
+def _in_sorted(sorted_hashes, hashes):
+    pos = np.searchsorted(sorted_hashes, hashes)
+    pos[pos == len(sorted_hashes)] = 0
+    return (sorted_hashes[pos] == hashes) if len(sorted_hashes) else np.zeros(len(hashes), dtype=bool)
+
+class DedupIndex:
+    '''Set of row hashes of everything already staged, kept as sorted uint64 arrays (8 bytes per row).
+       path=None keeps it in memory only (dedup within one run).
+       <path>.npy           compacted hashes of earlier loads, memory-mapped (not read into memory)
+       <path>.delta-*.npy   hashes added by one run each; merged into <path>.npy by compact()
+       Hashes seen in this run (and the deltas) are kept as a few sorted runs of doubling size,
+       merged like a binary counter: adding a chunk never re-sorts everything seen before it.'''
+
+    def __init__(self, path=None):
+        self.path = path
+        self.main = np.empty(0, dtype=np.uint64)
+        self.deltas = []
+        if path is not None and os.path.exists(path + ".npy"):
+            self.main = np.load(path + ".npy", mmap_mode="r")
+        if path is not None:
+            self.deltas = sorted(glob.glob(glob.escape(path) + ".delta-*.npy"))
+        self.runs = []
+        self._add_run(np.unique(np.concatenate([np.empty(0, dtype=np.uint64)] + [np.load(f) for f in self.deltas])))
+        self.added = []
+
+    def _add_run(self, hashes):
+        # hashes: sorted and not in any run yet; merged only into runs no longer than it,
+        # so there are about log2(n) runs and each hash is re-sorted about log2(n) times in total
+        if not len(hashes):
+            return
+        while self.runs and len(self.runs[-1]) <= len(hashes):
+            hashes = np.sort(np.concatenate([self.runs.pop(), hashes]))
+        self.runs.append(hashes)
+
+    def filter_new(self, df, key_columns=None):
+        '''Boolean mask of the rows of df not seen before (first occurrence only); marks them as seen.'''
+        hashes = row_hashes(df, key_columns)
+        is_new = ~pd.Series(hashes).duplicated().to_numpy()
+        for seen in [self.main] + self.runs:
+            is_new &= ~_in_sorted(seen, hashes)
+        new_hashes = hashes[is_new]
+        self._add_run(np.sort(new_hashes))
+        self.added.append(new_hashes)
+        return is_new
+
+    def save(self):
+        '''Writes the hashes added in this run as a new delta file (call after the staging write succeeded).'''
+        added = np.unique(np.concatenate([np.empty(0, dtype=np.uint64)] + self.added))
+        if self.path is None or not len(added):
+            return
+        delta_file = f"{self.path}.delta-{datetime.now():%Y%m%d%H%M%S%f}-{os.getpid()}.npy"
+        _save_hashes(delta_file, added)
+        self.deltas.append(delta_file)
+        self.added = []
+
+    def compact(self):
+        '''Merges all delta files into <path>.npy.'''
+        merged = np.unique(np.concatenate([np.asarray(self.main)] + self.runs))
+        _save_hashes(self.path + ".npy", merged)
+        for delta_file in self.deltas:
+            os.remove(delta_file)
+        self.main, self.runs, self.deltas = np.load(self.path + ".npy", mmap_mode="r"), [], []
+        print(f"Dedup index compacted: {len(merged)} hashes in {self.path}.npy")
+
+    @classmethod
+    def rebuild(cls, path, staging_files, key_columns=None, chunk_size=1000000):
+        '''Recreates the index from the staging files loaded so far (csv or parquet).'''
+        parts = []
+        for staging_file in staging_files:
+            if staging_file.endswith(".parquet"):
+                chunks = [pd.read_parquet(staging_file)]
+            else:
+                chunks = pd.read_csv(staging_file, dtype="string", chunksize=chunk_size)
+            for chunk in chunks:
+                parts.append(np.unique(row_hashes(chunk, key_columns)))
+        merged = np.unique(np.concatenate([np.empty(0, dtype=np.uint64)] + parts))
+        _save_hashes(path + ".npy", merged)
+        for delta_file in glob.glob(glob.escape(path) + ".delta-*.npy"):
+            os.remove(delta_file)
+        print(f"Dedup index rebuilt: {len(merged)} hashes in {path}.npy")
+        return cls(path)
+
+def _save_hashes(file_name, hashes):
+    with open(file_name + ".part", "wb") as f:
+        np.save(f, hashes)
+    os.replace(file_name + ".part", file_name)
+
+def cleanse_customers_chunked(src_file, dest_base, chunk_size, fmt="csv", dedup_index=None, rejects=None):
+    '''Streaming mode: reads src_file chunk_size rows at a time, runs cleanse_customers on
+       each chunk and appends the new rows to dest_base.<fmt>, so memory depends on the chunk size,
+       not the file size. Duplicates are removed across chunk boundaries with a DedupIndex
+       (in memory, or the persistent one when dedup_index is given).'''
+
+    index = dedup_index if dedup_index is not None else DedupIndex()
+    rows_written = 0
+    reports = []
+    writer = StagingWriter(dest_base, fmt)
+
+    for chunk in load_customers(src_file, chunksize=chunk_size):
+        df_selected, report = cleanse_customers(chunk, rejects)
+        reports.append(report)
+        with stage("drop_duplicates", rows=len(df_selected)):
+            df_selected = df_selected.drop_duplicates(subset=None, keep='first', inplace=False)
+            is_new = index.filter_new(df_selected)
+
+        with stage("write staging", rows=int(is_new.sum())):
+            writer.write(df_selected[is_new])
+        rows_written += int(is_new.sum())
+    writer.close()
+
+    print(merge_reports(reports).to_string(index=False))
+    print(f"Transformed data written successfully to {writer.path} ({rows_written} rows)")
+    return rows_written
+
+def _partition_ranges(src_file, partitions):
+    '''Splits the data rows of src_file into byte ranges that start and end on line boundaries.
+       (Assumes no line breaks inside quoted values.)'''
+    size = os.path.getsize(src_file)
+    with open(src_file, "rb") as f:
+        header_end = len(f.readline())
+        offsets = [header_end]
+        for i in range(1, partitions):
+            f.seek(max(header_end + (size - header_end) * i // partitions, offsets[-1]))
+            f.readline()                       # move on to the start of the next full line
+            offsets.append(min(f.tell(), size))
+        offsets.append(size)
+    return [(start, end) for start, end in zip(offsets, offsets[1:]) if start < end]
+
+def _cleanse_partition(src_file, start, end):
+    '''Worker: reads only its own byte range of src_file (plus the header) and cleanses it.
+       Returns (staging columns, report, rejected rows numbered from the partition start, row count).'''
+    with open(src_file, "rb") as f:
+        header = f.readline()
+        f.seek(start)
+        data = f.read(end - start)
+    df_partition = load_customers(io.BytesIO(header + data))
+    rejects = RejectWriter(None)
+    df_selected, report = cleanse_customers(df_partition, rejects)
+    return df_selected, report, rejects.pending, len(df_partition)
+
+def cleanse_customers_parallel(src_file, workers, rejects=None):
+    '''Multi-core mode: each worker process reads and cleanses one row partition of src_file;
+       the partition results are concatenated in file order, so the global drop_duplicates
+       keeps the same rows as a single-core run.'''
+    ranges = _partition_ranges(src_file, workers)
+    if not ranges:                                 # header only, nothing to split
+        return cleanse_customers(load_customers(src_file), rejects)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_cleanse_partition, [src_file] * len(ranges),
+                                [start for start, _ in ranges], [end for _, end in ranges]))
+
+    row_offset = 0
+    for _, _, rejected_parts, partition_rows in results:
+        if rejects is not None:
+            for rejected in rejected_parts:
+                rejected["source_row"] += row_offset
+                rejects.add_rejected(rejected)
+        row_offset += partition_rows
+
+    df_selected = pd.concat([df for df, _, _, _ in results], ignore_index=True)
+    return df_selected, merge_reports([report for _, report, _, _ in results])
+
+# Rows per chunk; None loads the whole customers.csv at once
+CHUNK_SIZE = None
+
+# Worker processes for the whole-file mode; 1 runs everything in this process
+WORKERS = 1
+
+# Staging output: "csv" -> stg_customers.csv, "parquet" -> stg_customers.parquet (needs pyarrow)
+STAGING_FORMAT = "csv"
+
+# Folder for the parsed-input cache of the single-process whole-file mode; None = no cache
+PARSED_CACHE_DIR = ".parsed_cache"
+
+# Rows failing a rule are written here (tagged with rule and source row); None = counts only
+REJECTS_FILE = "rejects_customers.csv"
+
+# Incremental dedup across runs: rows already staged by earlier runs are skipped
+# (None = dedup within this file only). Maintenance:
+#   python <this script> compact-dedup-index
+#   python <this script> rebuild-dedup-index stg_day1.csv stg_day2.csv ...
+DEDUP_INDEX = None       # e.g. "stg_customers_dedup"
+
+# Load stg_customers.csv into a database after staging (bulk_loader from Python_DataEng18;
+# a sqlite file stands in for the target). Rows are appended, as with APPEND in the sqlldr
+# control files. None = no load
+LOAD_DB = None           # e.g. "staging.db"
+LOAD_TABLE = "stg_customers"
+
+# Run manifest (sqlite) recording which stages are done for which customers.csv (path, size, mtime):
+# a rerun after a failure skips the staging if it was finished and only retries the load;
+# an unchanged file is not staged twice. None = no manifest; delete the file to force a full rerun
+RUN_MANIFEST = ".run_manifest.db"
+
+def stage_customers(src_file, dest_base, rejects_file=None, dedup_path=None, cache_dir=None):
+    '''Load, cleanse, validate and dedup src_file and write <dest_base>.<STAGING_FORMAT>;
+       whole-file, parallel or chunked as configured above. Returns the staging file path.'''
+    dedup_index = DedupIndex(dedup_path) if dedup_path else None
+    rejects = RejectWriter(rejects_file) if rejects_file else None
+
+    if CHUNK_SIZE is None:
+        if WORKERS > 1:
+            with stage(f"load + cleanse ({WORKERS} workers)", nbytes=os.path.getsize(src_file)) as info:
+                df_selected, report = cleanse_customers_parallel(src_file, WORKERS, rejects)
+                info["rows"] = len(df_selected)
+        else:
+            with stage(f"load {os.path.basename(src_file)}", nbytes=os.path.getsize(src_file)) as info:
+                df_stg_customers = load_customers(src_file, cache_dir=cache_dir)
+                info["rows"] = len(df_stg_customers)
+            df_selected, report = cleanse_customers(df_stg_customers, rejects)
+        print(report.to_string(index=False))
+
+        with stage("drop_duplicates", rows=len(df_selected)):
+            df_selected = df_selected.drop_duplicates(subset=None, keep='first', inplace=False)
+            if dedup_index is not None:
+                df_selected = df_selected[dedup_index.filter_new(df_selected)]
+
+        with stage("write staging", rows=len(df_selected)):
+            writer = StagingWriter(dest_base, STAGING_FORMAT)
+            writer.write(df_selected)
+            writer.close()
+
+        print(f"Transformed data written successfully to {writer.path}")
+        #print(df_selected.head())
+    else:
+        with stage("cleanse (chunked)", nbytes=os.path.getsize(src_file)):
+            cleanse_customers_chunked(src_file, dest_base, CHUNK_SIZE, STAGING_FORMAT, dedup_index, rejects)
+
+    if rejects is not None:
+        rejects.close()
+        rejects.print_summary()
+
+    # saved with the staging output, so a finished staging never leaves the index behind
+    if dedup_index is not None:
+        dedup_index.save()
+    return f"{dest_base}.{STAGING_FORMAT}"
+
+def load_staged(staging_file, db_path, table, bad_file=None):
+    '''Bulk-loads a staged csv into db_path (sqlite stand-in for the target). Returns the load summary.'''
+    import sqlite3
+    from bulk_loader import bulk_load
+    with stage("bulk load") as info:
+        conn = sqlite3.connect(db_path)
+        try:
+            load_summary = bulk_load(conn, staging_file, table, header_table=table + "_header",
+                                     bad_file=bad_file, create=True)
+        finally:
+            conn.close()
+        info["rows"] = load_summary["loaded"]
+    print(f"Loaded {load_summary['loaded']} rows into {db_path}:{table} ({load_summary['bad']} bad)")
+    return load_summary
 
-missing_count = check_missing_values(df_stg_customers, "pincode","df_stg_customers")
-print(missing_count)
-if missing_count == 0:
-    validate_column_length(df_stg_customers, "pincode",6,"df_stg_customers")
-    validate_column_length(df_stg_customers, "mobile",10,"df_stg_customers")
-    #validate_column_length(df_stg_customers, "city")
-else:
-    print("column length check not triggered due to presence of missing values")
+# loaded at import time so worker processes see it too; only the main process saves it
+join_date_cache = ValueCache.load("join_date_cache.pkl")
 
-missing_count = check_missing_values(df_stg_customers, "mobile","df_stg_customers")
-print(missing_count)
-if missing_count == 0:
-    validate_column_length(df_stg_customers, "mobile",10,"df_stg_customers")
-else:
-    print("column length check not triggered due to presence of missing values")
+# __main__ guard: worker processes re-import this script (always on Windows)
+if __name__ == "__main__" and sys.argv[1:2] == ["compact-dedup-index"]:
+    DedupIndex(DEDUP_INDEX or "stg_customers_dedup").compact()
 
-#invalid_email_count = check_email_validity(df_stg_customers, "email","df_stg_customers")
-invalid_email_count=check_email_validity(df_stg_customers, "email","@","df_stg_customers")
-if invalid_email_count>0:
-    print(f"Invalid Email entries {invalid_email_count} found ")
-else:
-    print(f"Invalid Email entries {invalid_email_count} found ")
+elif __name__ == "__main__" and sys.argv[1:2] == ["rebuild-dedup-index"]:
+    DedupIndex.rebuild(DEDUP_INDEX or "stg_customers_dedup", sys.argv[2:])
 
+elif __name__ == "__main__":
+    manifest = RUN_MANIFEST if RUN_MANIFEST and run_recorded is not None else None
+    input_fp = fingerprint("customers.csv") if manifest else None      # taken before anything runs
 
-cols_to_display = ["customer_id","name","city","state","join_date"]
-df_selected = df_stg_customers[cols_to_display]
+    def run_step(name, func, *args):
+        if manifest is None:
+            return func(*args)
+        state, result = run_recorded(manifest, input_fp, name, func, *args)
+        if state == "done":
+            print(f"{name}: already done for this customers.csv (run manifest), skipped")
+        return result
 
-df_selected = df_selected.drop_duplicates(subset=None, keep='first', inplace=False)
+    run_step("staging", stage_customers, "customers.csv", "stg_customers", REJECTS_FILE, DEDUP_INDEX,
+             PARSED_CACHE_DIR)
 
-#df_selected.to_csv("stg_customers.csv", index=False)
+    if LOAD_DB and STAGING_FORMAT == "csv":
+        run_step("bulk load", load_staged, "stg_customers.csv", LOAD_DB, LOAD_TABLE, "stg_customers.bad")
 
-#print("Transformed data written successfully to stg_customers.csv")
-#print(df_selected.head())
+    join_date_cache.save("join_date_cache.pkl")
+    log_stage_summary()
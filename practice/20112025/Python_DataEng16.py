@@ -0,0 +1,258 @@
+Feed Pipeline Benchmark
+=======================
+Generate realistic synthetic customer, supplier and order feeds (1M / 10M / 50M rows, with dirty values like
+mixed date formats, missing pincodes and bad emails), time every stage of the feed pipeline and write the
+results as JSON so two runs can be compared.
+
+C:\Users\user\Desktop\snowflake\Python\
+│
+├── file_utils.py              ← module from Python_DataEng10 (file checks, compression, purge)
+├── customer_cleansing.py      ← staging script from Python_DataEng14 (only its functions are imported)
+├── benchmark_pipeline.py      ← data generator + benchmark
+└── bench\                     ← generated feeds, archives and results (auto-created)
+
+Run:
+python benchmark_pipeline.py --rows 1000000 --out bench_1m.json
+python benchmark_pipeline.py --rows 10000000 --out bench_10m.json --compare bench_1m_before.json
+
+
+🧩 benchmark_pipeline.py → data generator + benchmark
+-----------------------------------------------------
+import os
+import io
+import json
+import time
+import shutil
+import argparse
+import platform
+import contextlib
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+import file_utils
+import customer_cleansing as cc
+
+CITIES = np.array(["Chennai", "Pune", "Mumbai", "Delhi", "Bangalore", "Hyderabad", "Kolkata", "Madurai"])
+STATES = np.array(["TN", "MH", "MH", "DL", "KA", "TS", "WB", "TN"])
+DATE_FORMATS = ["%Y-%m-%d", "%d-%m-%Y", "%d%m%Y"]
+FAR_DATES = np.array(["9999-12-31", "31-12-2300", "05051600"])   # warehouse sentinel / outside 1677-2262
+GEN_CHUNK_ROWS = 1000000             # rows generated and written at a time (memory stays flat)
+
+
+# Synthetic feeds
+# ---------------
+# Every attribute is derived from the id, so a repeated id is a full duplicate row
+# (dup_ratio of the rows are re-sends of an earlier id) and the data is the same for the same seed.
+def _dirty(ids, salt, ratio):
+    scrambled = (ids + salt * 7919) * 2654435761 % 4294967296     # spreads dirty rows over the file
+    return scrambled % 1000 < ratio * 1000
+
+
+def _customer_chunk(ids, dirty_ratio):
+    id_text = pd.Series(ids).astype(str)
+    slot = ids % len(CITIES)
+
+    join_dates = pd.Timestamp("2015-01-01") + pd.to_timedelta((ids * 7919) % 3650, unit="D")
+    fmt = ids % len(DATE_FORMATS)
+    join_date = pd.Series(np.select([fmt == i for i in range(len(DATE_FORMATS))],
+                                    [join_dates.strftime(f) for f in DATE_FORMATS]), dtype=object)
+    join_date[_dirty(ids, 31, dirty_ratio)] = "31/02/20XX"        # unparseable date
+    join_date[_dirty(ids, 37, dirty_ratio / 2)] = None            # missing date
+    far = _dirty(ids, 53, dirty_ratio / 5)
+    join_date[far] = FAR_DATES[ids[far] % len(FAR_DATES)]         # valid, but far in the past/future
+
+    pincode = pd.Series(600000 + ids % 100000, dtype="Int64")
+    pincode[_dirty(ids, 41, dirty_ratio)] = pd.NA                 # missing pincode
+    mobile = pd.Series(9000000000 + ids % 1000000000, dtype="Int64")
+    mobile[_dirty(ids, 43, dirty_ratio)] = ids[_dirty(ids, 43, dirty_ratio)] % 100000   # too short
+
+    email = "c" + id_text + "@mail.com"
+    email[_dirty(ids, 47, dirty_ratio)] = "c" + id_text + ".mail.com"                  # no @
+
+    return pd.DataFrame({
+        "customer_id": "C" + id_text,
+        "name": "CUSTOMER " + id_text,
+        "city": CITIES[slot],
+        "state": STATES[slot],
+        "join_date": join_date,
+        "loyalty_points": (ids * 13) % 20000,
+        "mobile": mobile,
+        "email": email,
+        "pincode": pincode,
+    })
+
+
+def _supplier_chunk(ids, dirty_ratio):
+    id_text = pd.Series(ids).astype(str)
+    slot = ids % len(CITIES)
+    email = "s" + id_text + "@supply.com"
+    email[_dirty(ids, 47, dirty_ratio)] = None
+    return pd.DataFrame({
+        "supplier_id": "S" + id_text,
+        "name": "SUPPLIER " + id_text,
+        "city": CITIES[slot],
+        "state": STATES[slot],
+        "mobile": 8000000000 + ids % 1000000000,
+        "email": email,
+    })
+
+
+def _order_chunk(ids, dirty_ratio):
+    qty = 1 + ids % 10
+    price = np.round(10 + (ids * 7) % 5000 / 3, 2)
+    order_date = (pd.Timestamp("2024-01-01") + pd.to_timedelta(ids % 700, unit="D")).strftime("%Y-%m-%d")
+    order_date = pd.Series(order_date, dtype=object)
+    order_date[_dirty(ids, 31, dirty_ratio)] = None
+    return pd.DataFrame({
+        "order_id": "O" + pd.Series(ids).astype(str),
+        "order_date": order_date,
+        "customer_id": "C" + pd.Series(1 + (ids * 17) % max(1, len(ids))).astype(str),
+        "item_id": "I" + pd.Series(ids % 5000).astype(str),
+        "qty": qty,
+        "price": price,
+        "amount": np.round(qty * price, 2),
+    })
+
+
+FEEDS = {"customer.csv": _customer_chunk, "supplier.csv": _supplier_chunk, "order.csv": _order_chunk}
+
+
+def generate_feed(path, make_chunk, rows, seed=42, dup_ratio=0.1, dirty_ratio=0.05):
+    rng = np.random.default_rng(seed)
+    distinct = max(1, int(rows * (1 - dup_ratio)))
+    written = 0
+    while written < rows:
+        n = min(GEN_CHUNK_ROWS, rows - written)
+        ids = np.arange(written + 1, written + n + 1)
+        resend = rng.random(n) < dup_ratio
+        ids[resend] = rng.integers(1, distinct + 1, int(resend.sum()))
+        make_chunk(ids, dirty_ratio).to_csv(path, mode="w" if written == 0 else "a",
+                                            header=written == 0, index=False)
+        written += n
+    return os.path.getsize(path)
+
+
+# Timing
+# ------
+def time_stage(results, stage, func, rows=None, nbytes=None):
+    with contextlib.redirect_stdout(io.StringIO()):      # validators print whole DataFrames
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        value = func()
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    entry = {"stage": stage, "wall_seconds": round(wall, 4), "cpu_seconds": round(cpu, 4),
+             "rows": rows, "bytes": nbytes,
+             "rows_per_second": round(rows / wall) if rows and wall else None}
+    results.append(entry)
+    print(f"{stage:<40} {wall:10.3f}s" + (f"  {entry['rows_per_second']:>12,} rows/s" if rows else ""))
+    return value
+
+
+def run_benchmark(work_dir, rows, seed=42, sample_rows=200000, compress_workers=1, purge_files=10000):
+    results = []
+    feed_dir = os.path.join(work_dir, "feed")
+    archive_dir = os.path.join(work_dir, "archive")
+    data_dir = os.path.join(work_dir, "data")
+    for d in (feed_dir, archive_dir, data_dir):
+        shutil.rmtree(d, ignore_errors=True)
+        os.makedirs(d)
+
+    # 1. generate the feeds (kept in data_dir, copied into feed_dir before compression)
+    sizes = {}
+    for name, make_chunk in FEEDS.items():
+        path = os.path.join(data_dir, name)
+        sizes[name] = time_stage(results, f"generate {name}", lambda: generate_feed(path, make_chunk, rows, seed),
+                                 rows)
+    customers_csv = os.path.join(data_dir, "customer.csv")
+
+    # 2. cleansing / validation stages on the customer feed
+    df_raw = time_stage(results, "read_csv (default dtypes)", lambda: pd.read_csv(customers_csv),
+                        rows, sizes["customer.csv"])
+    del df_raw
+    df = time_stage(results, "load_customers (schema dtypes)", lambda: cc.load_customers(customers_csv),
+                    rows, sizes["customer.csv"])
+
+    sample = df["join_date"].head(sample_rows).astype(object)
+    expected = time_stage(results, f"clean_and_format_date .apply ({len(sample)} rows)",
+                          lambda: sample.apply(cc.clean_and_format_date), len(sample))
+    # the vectorized version must give exactly the row-by-row results (NaT for unparseable)
+    got = cc.clean_and_format_date_column(sample)
+    if not expected.fillna("NaT").equals(got.fillna("NaT")):
+        raise AssertionError("clean_and_format_date_column differs from clean_and_format_date")
+    time_stage(results, "clean_and_format_date_column",
+               lambda: cc.clean_and_format_date_column(df["join_date"].astype(object)), rows)
+    df["join_date"] = time_stage(results, "normalize_unique(join_date)",
+                                 lambda: cc.normalize_unique(df["join_date"], cc.clean_and_format_date_column,
+                                                             vectorized=True), rows)
+
+    legacy = df[["pincode", "mobile", "email"]].copy()
+    time_stage(results, "check_missing_values(pincode)",
+               lambda: cc.check_missing_values(legacy, "pincode", "df"), rows)
+    time_stage(results, "validate_column_length(mobile)",
+               lambda: cc.validate_column_length(legacy.dropna(), "mobile", 10, "df"), rows)
+    time_stage(results, "check_email_validity(email)",
+               lambda: cc.check_email_validity(legacy, "email", "@", "df"), rows)
+    time_stage(results, "run_rules(CUSTOMER_RULES)", lambda: cc.run_rules(df, cc.CUSTOMER_RULES), rows)
+
+    df_selected = df[["customer_id", "name", "city", "state", "join_date"]]
+    time_stage(results, "drop_duplicates", lambda: df_selected.drop_duplicates(keep="first"), rows)
+    del df, df_selected, legacy
+
+    # 3. compression of all three feeds (copying them into the feed folder is not timed)
+    for name in FEEDS:
+        shutil.copy(os.path.join(data_dir, name), os.path.join(feed_dir, name))
+    time_stage(results, f"compress_and_archive (workers={compress_workers})",
+               lambda: file_utils.compress_and_archive(feed_dir, archive_dir, list(FEEDS), workers=compress_workers),
+               3 * rows, sum(sizes.values()))
+
+    # 4. purge: purge_files old archives plus the fresh ones
+    old = time.time() - 30 * 86400
+    for i in range(purge_files):
+        path = os.path.join(archive_dir, f"old_{i}.zip")
+        open(path, "wb").close()
+        os.utime(path, (old, old))
+    time_stage(results, f"purge_old_archives ({purge_files} old files)",
+               lambda: file_utils.purge_old_archives(archive_dir, days=7), purge_files)
+
+    return {
+        "run_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "rows": rows,
+        "seed": seed,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "cpu_count": os.cpu_count(),
+        "stages": results,
+    }
+
+
+def compare(current, baseline):
+    before = {entry["stage"]: entry["wall_seconds"] for entry in baseline["stages"]}
+    print(f"\n{'stage':<40} {'before':>10} {'now':>10} {'speedup':>8}")
+    for entry in current["stages"]:
+        if entry["stage"] in before and entry["wall_seconds"]:
+            print(f"{entry['stage']:<40} {before[entry['stage']]:10.3f} {entry['wall_seconds']:10.3f} "
+                  f"{before[entry['stage']] / entry['wall_seconds']:7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the feed pipeline on synthetic data")
+    parser.add_argument("--rows", type=int, default=1000000, help="rows per feed (e.g. 1000000, 10000000, 50000000)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--sample-rows", type=int, default=200000, help="rows for the slow row-by-row stages")
+    parser.add_argument("--compress-workers", type=int, default=1)
+    parser.add_argument("--purge-files", type=int, default=10000)
+    parser.add_argument("--work-dir", default="bench")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.work_dir, args.rows, args.seed, args.sample_rows,
+                           args.compress_workers, args.purge_files)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(result, json.load(f))
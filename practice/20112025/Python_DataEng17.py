@@ -0,0 +1,199 @@
+Keyed File Comparison
+=====================
+Compare two large CSV extracts (e.g. yesterday's and today's customers.csv) by key, the way the ksh
+"check arrays" script compares two arrays over column ranges like 1-4 and 7-10. Both files are
+hash-partitioned by key, each partition pair is compared in its own worker process, and only one
+partition pair per worker is held in memory.
+
+C:\Users\user\Desktop\snowflake\Python\
+│
+├── file_compare.py            ← diff engine + command line
+└── compare_out\               ← mismatches.csv, inserts.csv, deletes.csv (auto-created)
+
+Run:
+python file_compare.py customers_20251119.csv customers_20251120.csv --key customer_id --ranges "1-4,7-10"
+(exit code 1 when the files differ)
+
+
+🧩 file_compare.py → keyed diff engine
+-------------------------------------
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+CHUNK_ROWS = 500000                       # rows read at a time while partitioning
+PARTITION_BYTES = 128 * 1024 * 1024       # target partition size: one old + one new partition per worker in memory
+OUTPUTS = ("mismatches", "inserts", "deletes")
+
+
+def parse_ranges(spec):
+    '''"1-4,7-10" -> [0, 1, 2, 3, 6, 7, 8, 9]: 1-based inclusive column ranges, as in the ksh check.'''
+    positions = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        start, end = int(start), int(end or start)
+        if start < 1 or end < start:
+            raise ValueError(f"Bad column range '{part}'")
+        positions.extend(range(start - 1, end))
+    return list(dict.fromkeys(positions))
+
+
+def _read_csv(path, **kwargs):
+    # every value as text, so "007" and "7" differ and empty stays empty
+    return pd.read_csv(path, dtype=str, keep_default_na=False, **kwargs)
+
+
+# Partitioning
+# ------------
+# Both files are split into the same number of partition files by a hash of the key,
+# so a key always lands in the partition with the same number in both files.
+def partition_file(path, work_dir, tag, key_columns, partitions, chunk_rows=CHUNK_ROWS):
+    header = _read_csv(path, nrows=0).columns.tolist()
+    missing = [column for column in key_columns if column not in header]
+    if missing:
+        raise ValueError(f"Key column(s) {missing} not in {path}")
+
+    paths = [os.path.join(work_dir, f"{tag}-{p:04d}.csv") for p in range(partitions)]
+    for part_path in paths:                           # header in every partition, also the empty ones
+        pd.DataFrame(columns=header).to_csv(part_path, index=False)
+
+    rows = 0
+    for chunk in _read_csv(path, chunksize=chunk_rows):
+        part = pd.util.hash_pandas_object(chunk[key_columns], index=False).to_numpy() % partitions
+        for p, part_rows in chunk.groupby(part, sort=False):
+            part_rows.to_csv(paths[p], mode="a", header=False, index=False)
+        rows += len(chunk)
+    return header, paths, rows
+
+
+# Comparison of one partition pair
+# --------------------------------
+def compare_partition(old_path, new_path, out_prefix, key_columns, positions):
+    old = _read_csv(old_path)
+    new = _read_csv(new_path)
+    duplicates = (int(old.duplicated(key_columns).sum()), int(new.duplicated(key_columns).sum()))
+    old = old.drop_duplicates(key_columns)            # first row of a repeated key wins
+    new = new.drop_duplicates(key_columns)
+
+    old_keys = pd.MultiIndex.from_frame(old[key_columns])
+    new_keys = pd.MultiIndex.from_frame(new[key_columns])
+    in_new = old_keys.isin(new_keys)
+    in_old = new_keys.isin(old_keys)
+    old[~in_new].to_csv(f"{out_prefix}.deletes.csv", index=False)
+    new[~in_old].to_csv(f"{out_prefix}.inserts.csv", index=False)
+
+    # same key in both files: line the rows up by key and compare the range columns as one block
+    old_common = old[in_new].set_index(old_keys[in_new])
+    new_common = new[in_old].set_index(new_keys[in_old]).reindex(old_common.index)
+    compare = [p for p in positions if old.columns[p] not in key_columns]
+    old_values = old_common.iloc[:, compare].to_numpy()
+    new_values = new_common.iloc[:, compare].to_numpy()
+    row, col = np.nonzero(old_values != new_values)
+
+    mismatches = old_common.index[row].to_frame(index=False)
+    mismatches["column"] = new.columns[np.asarray(compare, dtype=int)[col]]
+    mismatches["old_value"] = old_values[row, col]
+    mismatches["new_value"] = new_values[row, col]
+    mismatches.to_csv(f"{out_prefix}.mismatches.csv", index=False)
+
+    return {"old_rows": len(old) + duplicates[0], "new_rows": len(new) + duplicates[1],
+            "matched": len(old_common), "mismatched_rows": len(np.unique(row)), "mismatched_values": len(row),
+            "inserts": int((~in_old).sum()), "deletes": int((~in_new).sum()),
+            "duplicate_keys_old": duplicates[0], "duplicate_keys_new": duplicates[1]}
+
+
+def _concat_parts(part_paths, dest):
+    '''Appends the partition outputs into one file, keeping only the first header.'''
+    with open(dest, "wb") as out:
+        for i, part_path in enumerate(part_paths):
+            with open(part_path, "rb") as part:
+                header = part.readline()
+                if i == 0:
+                    out.write(header)
+                shutil.copyfileobj(part, out)
+
+
+def compare_files(old_file, new_file, key_columns, ranges, out_dir, workers=None, partitions=None,
+                  work_dir=None):
+    '''Keyed diff of two CSV extracts (e.g. yesterday's and today's customers.csv).
+       key_columns : column names identifying a row
+       ranges      : columns to compare, "1-4,7-10" (1-based positions, same positions in both files)
+       Writes <out_dir>/mismatches.csv (key, column, old_value, new_value), inserts.csv (rows only
+       in new_file) and deletes.csv (rows only in old_file); returns the summary counts.
+       Memory is bounded by one partition pair per worker: raise partitions for bigger files.'''
+    workers = workers or os.cpu_count() or 1
+    positions = parse_ranges(ranges)
+    if partitions is None:
+        biggest = max(os.path.getsize(old_file), os.path.getsize(new_file))
+        partitions = max(workers, -(-biggest // PARTITION_BYTES))
+    os.makedirs(out_dir, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix=".compare-", dir=work_dir or out_dir)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            old_job = pool.submit(partition_file, old_file, work_dir, "old", key_columns, partitions)
+            new_job = pool.submit(partition_file, new_file, work_dir, "new", key_columns, partitions)
+            old_header, old_parts, _ = old_job.result()
+            new_header, new_parts, _ = new_job.result()
+
+            width = min(len(old_header), len(new_header))
+            if positions and positions[-1] >= width:
+                raise ValueError(f"Column range {ranges} is wider than the files ({width} common columns)")
+            if old_header != new_header:
+                print(f"Headers differ, columns are compared by position: {old_header} vs {new_header}")
+
+            prefixes = [os.path.join(work_dir, f"result-{p:04d}") for p in range(partitions)]
+            results = list(pool.map(compare_partition, old_parts, new_parts, prefixes,
+                                    [key_columns] * partitions, [positions] * partitions))
+
+        for name in OUTPUTS:
+            _concat_parts([f"{prefix}.{name}.csv" for prefix in prefixes], os.path.join(out_dir, f"{name}.csv"))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {key: sum(result[key] for result in results) for key in results[0]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keyed comparison of two CSV extracts")
+    parser.add_argument("old_file")
+    parser.add_argument("new_file")
+    parser.add_argument("--key", required=True, help="key column name(s), comma separated")
+    parser.add_argument("--ranges", required=True, help='columns to compare, e.g. "1-4,7-10"')
+    parser.add_argument("--out-dir", default="compare_out")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--partitions", type=int)
+    args = parser.parse_args()
+
+    summary = compare_files(args.old_file, args.new_file, args.key.split(","), args.ranges, args.out_dir,
+                            args.workers, args.partitions)
+    for key, value in summary.items():
+        print(f"{key:<20} {value:>12,}")
+    sys.exit(1 if summary["mismatched_values"] or summary["inserts"] or summary["deletes"] else 0)
+
+
+🧾 Example Output
+-----------------
+old_rows                  300,001
+new_rows                  299,999
+matched                   299,998
+mismatched_rows                 3
+mismatched_values               3
+inserts                         1
+deletes                         2
+duplicate_keys_old              1
+duplicate_keys_new              0
+
+compare_out\mismatches.csv
+customer_id,column,old_value,new_value
+C30,pincode,600001,0
+C5,city,X,Y
+C20,mobile,9000000020,1